@@ -0,0 +1,171 @@
+# coding: utf-8
+"""
+    Run the benchmarks without pytest::
+
+        python -m benchmarks --output results.json
+        python -m benchmarks --save-baseline
+        python -m benchmarks --compare
+
+    Results are written as JSON, with the size of the output of the cases
+    that return bytes, e.g. the encoder profiles, and the import time of the
+    modules as ``import[<module>]`` cases. With ``--compare``, the results are checked
+    against the stored baseline, and the command exits with status 1 when a
+    case is slower than the baseline by more than ``--threshold``.
+"""
+
+from __future__ import annotations
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import typing as t
+import PIL
+from .cases import CASES, IMPORTS, Case
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def measure(case: Case, repeat: int, min_time: float) -> dict[str, t.Any]:
+    func = case.setup()
+    output = func()
+    # find a number of calls that takes at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    result = {
+        'min': min(timings),
+        'mean': statistics.mean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': repeat,
+        'iterations': number,
+    }
+    if isinstance(output, (bytes, bytearray)):
+        result['bytes'] = len(output)
+    return result
+
+
+IMPORT_SCRIPT = '''
+import time
+start = time.perf_counter()
+import {}
+print(time.perf_counter() - start)
+'''
+
+
+def measure_import(module: str, repeat: int) -> dict[str, t.Any]:
+    # a fresh interpreter each round, nothing is imported yet
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT.format(module)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        timings.append(float(output))
+    return {
+        'min': min(timings),
+        'mean': statistics.mean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': repeat,
+        'iterations': 1,
+    }
+
+
+def environment() -> dict[str, str]:
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = ''
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'pillow': PIL.__version__,
+        'numpy': numpy_version,
+    }
+
+
+def compare(results: dict[str, t.Any], baseline: dict[str, t.Any],
+            threshold: float) -> list[str]:
+    """Return the names of the cases slower than the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = result['min'] / base['min']
+        mark = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            mark = '  REGRESSION'
+        print(f'{name:<48} {ratio:6.2f}x{mark}')
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-k', '--filter', default='*', help='glob pattern of case names')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help='seconds per round')
+    parser.add_argument('-o', '--output', help='write JSON results to the file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results: dict[str, t.Any] = {}
+    for case in CASES:
+        if not fnmatch.fnmatch(case.name, args.filter):
+            continue
+        result = measure(case, args.repeat, args.min_time)
+        results[case.name] = result
+        size = f'{result["bytes"]:10d} B' if 'bytes' in result else ''
+        print(f'{case.name:<48} {result["min"] * 1000:10.3f} ms{size}', file=sys.stderr)
+    for module in IMPORTS:
+        name = f'import[{module}]'
+        if not fnmatch.fnmatch(name, args.filter):
+            continue
+        results[name] = measure_import(module, args.repeat)
+        print(f'{name:<48} {results[name]["min"] * 1000:10.3f} ms', file=sys.stderr)
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        if not os.path.isfile(args.baseline):
+            print(f'no baseline at {args.baseline}, use --save-baseline', file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline['results'], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
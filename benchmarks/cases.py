@@ -0,0 +1,221 @@
+# coding: utf-8
+"""
+    benchmarks.cases
+    ~~~~~~~~~~~~~~~~
+
+    The benchmark cases, shared by the CLI and pytest-benchmark.
+"""
+
+from __future__ import annotations
+import os
+import secrets
+import shutil
+import tempfile
+import typing as t
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from captcha import audio, image
+from captcha.audio import AudioCaptcha, VoiceBank, S16_16000, S16_22050
+from io import BytesIO
+from captcha.image import ImageCaptcha, DEFAULT_FONTS, PROFILES
+from captcha.arena import BufferPool
+from captcha.diskcache import DiskCache
+from captcha.rng import SeededRandomSource
+
+Func = t.Callable[[], t.Any]
+
+
+class Case(t.NamedTuple):
+    name: str
+    #: prepare the data of a case, return the function to be measured
+    setup: t.Callable[[], Func]
+
+
+CASES: list[Case] = []
+
+#: the modules whose import time is measured, each in a fresh interpreter
+IMPORTS = ['captcha', 'captcha.image', 'captcha.audio', 'captcha.pool']
+
+
+def _text(length: int) -> str:
+    return ''.join(secrets.choice('0123456789') for _ in range(length))
+
+
+def _image_case(name: str, length: int = 4, format: str = 'png',
+                fused_warp: bool = False, noise_variants: int = 0,
+                batch_composite: bool = False, **kwargs: t.Any) -> None:
+    def setup() -> Func:
+        captcha = ImageCaptcha(**kwargs)
+        captcha.fused_warp = fused_warp
+        captcha.noise_variants = noise_variants
+        captcha.batch_composite = batch_composite
+        chars = _text(length)
+        captcha.generate(chars, format=format)
+        return lambda: captcha.generate(chars, format=format)
+    CASES.append(Case(f'image.generate[{name}]', setup))
+
+
+def _thread_case(name: str, threads: int, batch: int = 32, **attrs: t.Any) -> None:
+    # a batch of CAPTCHAs split across the threads, compare the time of
+    # the same batch with 1 to N threads to see how generation scales
+    def setup() -> Func:
+        captcha = ImageCaptcha()
+        for key, value in attrs.items():
+            setattr(captcha, key, value)
+        codes = [_text(4) for _ in range(batch)]
+        captcha.generate(codes[0])
+        executor = ThreadPoolExecutor(threads)
+        weakref.finalize(captcha, executor.shutdown)
+        return lambda: list(executor.map(captcha.generate, codes))
+    CASES.append(Case(f'image.threads[{name},{threads}]', setup))
+
+
+def _encode_case(profile: str) -> None:
+    # the encoded data is returned, to report its size next to the time
+    def setup() -> Func:
+        captcha = ImageCaptcha(rng=SeededRandomSource(0))
+        im = captcha.generate_image('1234')
+        encoder = PROFILES[profile]
+
+        def encode() -> bytes:
+            out = BytesIO()
+            encoder.save(im, out)
+            return out.getvalue()
+        return encode
+    CASES.append(Case(f'image.encode[{profile}]', setup))
+
+
+def _audio_case(name: str, length: int = 4, **options: t.Any) -> None:
+    def setup() -> Func:
+        captcha = AudioCaptcha(**options)
+        chars = _text(length)
+        captcha.generate(chars)
+        return lambda: captcha.generate(chars)
+    CASES.append(Case(f'audio.generate[{name}]', setup))
+
+
+def _audio_write_case(name: str, **options: t.Any) -> None:
+    def setup() -> Func:
+        captcha = AudioCaptcha(**options)
+        out = BytesIO()
+        chars = _text(4)
+
+        def write() -> None:
+            out.seek(0)
+            captcha.write(chars, out)
+        write()
+        return write
+    CASES.append(Case(f'audio.write[{name}]', setup))
+
+
+@contextmanager
+def engine(name: str) -> t.Iterator[None]:
+    """Run the audio primitives with the given engine, numpy or python."""
+    speedups = audio._speedups
+    if name == 'python':
+        audio._speedups = None
+    try:
+        yield
+    finally:
+        audio._speedups = speedups
+
+
+def _diskcache_case() -> None:
+    # serving a pre-rendered CAPTCHA, instead of generating it
+    def setup() -> Func:
+        tmp = tempfile.mkdtemp()
+        cache = DiskCache(tmp)
+        # the directory is removed with the case
+        weakref.finalize(cache, shutil.rmtree, tmp, True)
+        captcha = ImageCaptcha()
+        for _ in range(64):
+            chars = _text(4)
+            cache.put(chars, captcha.generate(chars).getvalue())
+
+        def serve() -> bytes:
+            entry = cache.random()
+            cache.verify(entry.key, '0000')
+            return bytes(entry.payload)
+        return serve
+    CASES.append(Case('diskcache.serve', setup))
+
+
+def _cold_start_case() -> None:
+    # the first CAPTCHA of a fresh process, without the shared fonts or voices
+    def image_setup() -> Func:
+        def run() -> t.Any:
+            image._fonts.clear()
+            return ImageCaptcha().warmup()
+        return run
+
+    def audio_setup() -> Func:
+        def run() -> t.Any:
+            audio._voices.clear()
+            return AudioCaptcha().warmup()
+        return run
+
+    CASES.append(Case('image.cold-start', image_setup))
+    CASES.append(Case('audio.cold-start', audio_setup))
+
+
+def _primitive_case(name: str, func: Func) -> None:
+    def make_setup(engine_name: str) -> t.Callable[[], Func]:
+        def setup() -> Func:
+            def run() -> t.Any:
+                with engine(engine_name):
+                    return func()
+            return run
+        return setup
+
+    engines = ['python']
+    if audio._speedups is not None:
+        engines.append('numpy')
+    for engine_name in engines:
+        CASES.append(Case(f'audio.{name}[{engine_name}]', make_setup(engine_name)))
+
+
+for size in [(160, 60), (320, 120)]:
+    for length in (4, 8):
+        _image_case(
+            f'{size[0]}x{size[1]}-len{length}',
+            length=length, width=size[0], height=size[1],
+        )
+for format in ('png', 'jpeg', 'webp', 'gif'):
+    _image_case(format, format=format)
+_image_case('fonts-x6', fonts=DEFAULT_FONTS * 2, font_sizes=(36, 42, 50))
+_image_case('fused-warp', fused_warp=True)
+_image_case('overflow-len16', length=16)
+_image_case('noise-atlas', noise_variants=32)
+_image_case('arena', arena=BufferPool())
+_image_case('batch-composite', batch_composite=True)
+_image_case('fused-batch', fused_warp=True, batch_composite=True)
+for threads in sorted({1, 2, 4, os.cpu_count() or 1}):
+    _thread_case('classic', threads)
+    _thread_case('fused-batch', threads, fused_warp=True, batch_composite=True)
+for profile in PROFILES:
+    _encode_case(profile)
+
+for length in (4, 8):
+    _audio_case(f'len{length}', length)
+if audio._speedups is not None:
+    for fmt in (S16_16000, S16_22050):
+        name = f's16-{fmt.rate}'
+        _audio_case(name, sample_format=fmt)
+        _audio_case(f'{name}-bank', sample_format=fmt, bank=VoiceBank(preload=True))
+_audio_write_case('default')
+_audio_write_case('arena', arena=BufferPool())
+_cold_start_case()
+_diskcache_case()
+
+VOICE = audio._read_wave_file(os.path.join(audio.DATA_DIR, '5', 'default.wav'))
+NOISE = bytearray(secrets.token_bytes(len(VOICE) * 3))
+
+_primitive_case('change_speed', lambda: audio.change_speed(VOICE, 0.93))
+_primitive_case('change_speed_linear', lambda: audio.change_speed(VOICE, 0.93, 'linear'))
+_primitive_case('change_sound', lambda: audio.change_sound(VOICE, 0.85))
+_primitive_case('mix_wave', lambda: audio.mix_wave(VOICE, bytearray(NOISE)))
+_primitive_case('mix_wave_into', lambda: audio.mix_wave_into(bytearray(NOISE), VOICE, 100))
+_primitive_case('create_noise', lambda: audio.create_noise(audio.WAVE_SAMPLE_RATE, 4))
+_primitive_case('create_silence', lambda: audio.create_silence(audio.WAVE_SAMPLE_RATE))
+_primitive_case('patch_wave_header', lambda: audio.patch_wave_header(NOISE))
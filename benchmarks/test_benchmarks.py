@@ -0,0 +1,11 @@
+# coding: utf-8
+
+import pytest
+from .cases import CASES
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case.name for case in CASES])
+def test_benchmark(benchmark, case):
+    benchmark(case.setup())
@@ -6,10 +6,62 @@
 
     A captcha library that generates audio and image CAPTCHAs.
 
+    The main classes are exported by the package, each submodule is only
+    imported on the first access of one of its names::
+
+        from captcha import ImageCaptcha
+
     :copyright: (c) 2014 by Hsiaoming Yang.
     :license: BSD, see LICENSE for more details.
 """
 
+# not imported from typing, the package itself imports nothing
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .aio import AsyncRenderer
+    from .arena import BufferPool
+    from .audio import AudioCaptcha
+    from .diskcache import DiskCache
+    from .image import ImageCaptcha
+    from .parallel import ParallelCaptcha
+    from .pool import CaptchaPool
+
 __version__ = '0.7.1'
 __author__ = 'Hsiaoming Yang <me@lepture.com>'
 __homepage__ = 'https://github.com/lepture/captcha'
+
+__all__ = [
+    'ImageCaptcha',
+    'AudioCaptcha',
+    'ParallelCaptcha',
+    'AsyncRenderer',
+    'CaptchaPool',
+    'DiskCache',
+    'BufferPool',
+]
+
+# the submodule of every exported name
+_exports = {
+    'ImageCaptcha': 'image',
+    'AudioCaptcha': 'audio',
+    'ParallelCaptcha': 'parallel',
+    'AsyncRenderer': 'aio',
+    'CaptchaPool': 'pool',
+    'DiskCache': 'diskcache',
+    'BufferPool': 'arena',
+}
+
+
+def __getattr__(name: str) -> object:
+    import importlib
+
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> 'list[str]':
+    return sorted(set(globals()) | set(_exports))
@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+    captcha._speedups
+    ~~~~~~~~~~~~~~~~~
+
+    NumPy implementations of the audio primitives in :mod:`captcha.audio`.
+
+    Every function here computes exactly the same bytes as the pure Python
+    reference in :mod:`captcha.audio`, only in bulk. Importing this module
+    raises ``ImportError`` when NumPy is not installed, in which case the
+    pure Python functions are used instead.
+"""
+
+from __future__ import annotations
+import os
+import typing as t
+import numpy as np
+import numpy.typing as npt
+
+__all__ = [
+    'change_speed',
+    'change_speed_linear',
+    'change_sound',
+    'mix_wave',
+    'mix_wave_into',
+    'create_noise',
+    'change_speed_s16',
+    'change_sound_s16',
+    'mix_wave_into_s16',
+    'create_noise_s16',
+    'reverse_s16',
+    'convert',
+]
+
+U8 = npt.NDArray[np.uint8]
+S16 = npt.NDArray[np.int16]
+F64 = npt.NDArray[np.float64]
+
+
+def _view(body: bytearray | memoryview) -> U8:
+    return np.frombuffer(body, dtype=np.uint8)
+
+
+def _view_s16(body: bytearray | memoryview) -> S16:
+    return np.frombuffer(body, dtype='<i2')
+
+
+def _to_s16(values: F64) -> bytearray:
+    return bytearray(np.clip(values, -32768, 32767).astype('<i2').tobytes())
+
+
+def change_speed(body: bytearray, speed: float) -> bytearray:
+    length = int(len(body) * speed)
+    # ``np.cumsum`` accumulates sequentially, so the steps are the very same
+    # floats the reference loop gets with ``step += speed``.
+    steps = np.empty(len(body) + 1, dtype=np.float64)
+    steps[0] = 0
+    np.cumsum(np.full(len(body), speed, dtype=np.float64), out=steps[1:])
+    bounds = np.minimum(steps.astype(np.int64), length)
+    counts = np.maximum(np.diff(bounds), 0)
+
+    rv = bytearray(length)
+    data = np.repeat(_view(body), counts)
+    _view(rv)[:len(data)] = data[:length]
+    return rv
+
+
+def change_speed_linear(body: bytearray, speed: float) -> bytearray:
+    length = int(len(body) * speed)
+    if not length:
+        return bytearray()
+    src = _view(body).astype(np.float64)
+    # the slopes of np.interp are (b - a) / 1, the same as the reference
+    x = np.arange(length) / speed
+    out = np.floor(np.interp(x, np.arange(len(src), dtype=np.float64), src) + 0.5)
+    return bytearray(out.astype(np.uint8).tobytes())
+
+
+def change_sound(body: bytearray, level: float) -> bytearray:
+    src = _view(body).astype(np.float64)
+    high = np.clip(np.trunc((src - 128) * level + 128), 128, 255)
+    low = np.clip(np.trunc(128 - (128 - src) * level), 0, 128)
+    out = np.where(src > 128, high, np.where(src < 128, low, src))
+    return bytearray(out.astype(np.uint8).tobytes())
+
+
+def _mix(src: U8, target: U8) -> None:
+    sv = src.astype(np.int32)
+    dv = target.astype(np.int32)
+    product = sv * dv
+    # the reference truncates ``product / 128``, which is exact in integers:
+    # a floor when it is added, a ceiling when it is subtracted, the other
+    # terms of the second branch keep the result non-negative.
+    mixed = np.where(
+        (sv < 128) & (dv < 128),
+        product >> 7,
+        2 * (sv + dv) - 256 - ((product + 127) >> 7),
+    )
+    target[:] = mixed
+
+
+def mix_wave(src: bytearray, dst: bytearray) -> bytearray:
+    if len(src) > len(dst):
+        # output should be longer
+        dst, src = src, dst
+
+    _mix(_view(src), _view(dst)[:len(src)])
+    return dst
+
+
+def mix_wave_into(dst: bytearray | memoryview, src: bytearray, offset: int = 0) -> None:
+    target = _view(dst)[offset:offset + len(src)]
+    _mix(_view(src)[:len(target)], target)
+
+
+def create_noise(length: int, level: int = 4,
+                 randbytes: t.Callable[[int], bytes] = os.urandom) -> bytearray:
+    adjust = 128 - int(level / 2)
+    # draw uniform values below 257 from 16-bit CSPRNG words, rejecting the
+    # single word that would bias the distribution.
+    limit = 65536 - 65536 % 257
+    values = np.empty(0, dtype=np.uint16)
+    while len(values) < length:
+        need = length - len(values)
+        words = np.frombuffer(randbytes(need * 2), dtype='<u2')
+        values = np.concatenate([values, words[words < limit]])
+    noise = (values[:length] % 257) % level + adjust
+    return bytearray(noise.astype(np.uint8).tobytes())
+
+
+# 16-bit signed PCM, there is no pure Python reference of these
+
+
+def _resample(src: F64, length: int, linear: bool) -> F64:
+    # the output sample i is at i / speed of the input
+    if not length or not len(src):
+        return np.zeros(length, dtype=np.float64)
+    x = np.arange(length) * (len(src) / length)
+    if linear:
+        return t.cast(F64, np.interp(x, np.arange(len(src), dtype=np.float64), src))
+    return src[np.minimum(x.astype(np.int64), len(src) - 1)]
+
+
+def change_speed_s16(body: bytearray, speed: float, linear: bool = False) -> bytearray:
+    src = _view_s16(body).astype(np.float64)
+    out = _resample(src, int(len(src) * speed), linear)
+    return _to_s16(np.rint(out))
+
+
+def change_sound_s16(body: bytearray, level: float) -> bytearray:
+    return _to_s16(np.trunc(_view_s16(body) * level))
+
+
+def mix_wave_into_s16(dst: bytearray | memoryview, src: bytearray, offset: int = 0) -> None:
+    target = _view_s16(dst)[offset:offset + len(src) // 2]
+    # the same formula as 8-bit samples, of unsigned 16-bit values
+    sv = _view_s16(src)[:len(target)].astype(np.int64) + 32768
+    dv = target.astype(np.int64) + 32768
+    product = sv * dv / 32768
+    mixed = np.where(
+        (sv < 32768) & (dv < 32768),
+        np.trunc(product),
+        np.trunc(2 * (sv + dv) - product - 65536),
+    )
+    target[:] = np.clip(mixed - 32768, -32768, 32767).astype('<i2')
+
+
+def create_noise_s16(length: int, level: int = 4,
+                     randbytes: t.Callable[[int], bytes] = os.urandom) -> bytearray:
+    noise = _view(create_noise(length, level, randbytes)).astype(np.int16)
+    return bytearray(((noise - 128) * 256).astype('<i2').tobytes())
+
+
+def reverse_s16(body: bytearray | memoryview) -> bytearray:
+    return bytearray(_view_s16(body)[::-1].tobytes())
+
+
+def convert(body: bytearray | memoryview, width: int, rate: int,
+            to_width: int, to_rate: int) -> bytearray:
+    """Convert 8-bit unsigned or 16-bit signed PCM to another width and
+    frame rate, with linear interpolation."""
+    if width == 1:
+        src = (_view(body).astype(np.float64) - 128) * 256
+    else:
+        src = _view_s16(body).astype(np.float64)
+    if rate != to_rate:
+        src = _resample(src, int(len(src) * to_rate / rate), True)
+    if to_width == 1:
+        out = np.clip(np.floor(src / 256 + 128.5), 0, 255)
+        return bytearray(out.astype(np.uint8).tobytes())
+    return _to_s16(np.rint(src))
@@ -0,0 +1,120 @@
+# coding: utf-8
+"""
+    captcha.aio
+    ~~~~~~~~~~~
+
+    Run CAPTCHA generation off the asyncio event loop.
+"""
+
+from __future__ import annotations
+import asyncio
+import functools
+import time
+import typing as t
+from concurrent.futures import Executor
+
+__all__ = ['AsyncRenderer', 'RenderMetrics', 'RenderQueueFull']
+
+T = t.TypeVar('T')
+
+
+class RenderMetrics(t.NamedTuple):
+    #: seconds from the call until a worker started rendering
+    queue_wait: float
+    #: seconds spent in rendering
+    render_time: float
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many CAPTCHAs are already waiting to be rendered."""
+
+
+def _timed(func: t.Callable[[], T]) -> tuple[T, float, float]:
+    start = time.perf_counter()
+    rv = func()
+    return rv, start, time.perf_counter()
+
+
+class AsyncRenderer:
+    """Render CAPTCHAs in an executor, with bounded concurrency.
+
+    At most ``max_concurrency`` CAPTCHAs are rendered at the same time, the
+    other calls wait for their turn. When ``max_pending`` calls are already
+    waiting or rendering, new calls raise :class:`RenderQueueFull` instead of
+    piling up::
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        renderer = AsyncRenderer(
+            executor=ThreadPoolExecutor(4),
+            max_concurrency=4,
+            max_pending=100,
+        )
+        captcha = ImageCaptcha()
+        captcha.renderer = renderer
+        data = await captcha.agenerate('1234')
+
+    The function and the CAPTCHA instance are not sent to other processes,
+    use a thread pool executor, or :mod:`captcha.parallel` for processes.
+
+    :param executor: the executor to render in, default to the loop's one.
+    :param max_concurrency: the maximum number of CAPTCHAs in rendering.
+    :param max_pending: the maximum number of waiting and rendering calls.
+    :param observer: a callable that receives the metrics of every call.
+    """
+    def __init__(
+            self,
+            executor: Executor | None = None,
+            max_concurrency: int = 4,
+            max_pending: int | None = None,
+            observer: t.Callable[[RenderMetrics], None] | None = None):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.observer = observer
+
+        #: number of calls waiting or rendering
+        self.pending = 0
+        #: number of rendered CAPTCHAs
+        self.completed = 0
+        #: number of calls rejected with RenderQueueFull
+        self.rejected = 0
+        #: total seconds of queue wait and rendering
+        self.queue_wait = 0.0
+        self.render_time = 0.0
+        #: metrics of the last rendered CAPTCHA
+        self.last: RenderMetrics | None = None
+
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, func: t.Callable[..., T], *args: t.Any, **kwargs: t.Any) -> T:
+        """Call the function in the executor and wait for its result."""
+        if self.max_pending is not None and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise RenderQueueFull(f'{self.pending} CAPTCHAs are pending')
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        queued = time.perf_counter()
+        try:
+            async with self._get_semaphore(loop):
+                call = functools.partial(func, *args, **kwargs)
+                rv, start, end = await loop.run_in_executor(self.executor, _timed, call)
+        finally:
+            self.pending -= 1
+
+        metrics = RenderMetrics(start - queued, end - start)
+        self.completed += 1
+        self.queue_wait += metrics.queue_wait
+        self.render_time += metrics.render_time
+        self.last = metrics
+        if self.observer is not None:
+            self.observer(metrics)
+        return rv
@@ -0,0 +1,136 @@
+# coding: utf-8
+"""
+    captcha.arena
+    ~~~~~~~~~~~~~
+
+    Recycle the scratch buffers of CAPTCHA generation.
+
+    Every CAPTCHA allocates a canvas or a sample buffer, which is garbage
+    as soon as it is encoded. Under sustained load, a :class:`BufferPool`
+    keeps a bounded number of them for the next CAPTCHAs instead::
+
+        arena = BufferPool(max_bytes=8 * 1024 * 1024)
+        image = ImageCaptcha(arena=arena)
+        audio = AudioCaptcha(arena=arena)
+        ...
+        print(arena.stats())
+"""
+
+from __future__ import annotations
+import threading
+import typing as t
+from PIL.Image import Image, new as createImage
+
+__all__ = ['BufferPool']
+
+ColorTuple = t.Union[t.Tuple[int, int, int], t.Tuple[int, int, int, int]]
+
+
+class BufferPool:
+    """A bounded pool of reusable byte buffers and images, which is safe
+    to share between threads.
+
+    Byte buffers are pooled by size class, a power of two no smaller than
+    ``min_size``, an acquired buffer is at least the requested size and its
+    content is undefined. Images are pooled by mode and size, and filled with
+    the requested color when they are acquired.
+
+    A released buffer is dropped when the pool holds ``max_per_size`` buffers
+    of its size already, or when it would exceed ``max_bytes``.
+
+    :param max_bytes: the ceiling of the memory held by the pool.
+    :param max_per_size: the number of buffers kept for every size.
+    """
+    min_size: int = 4096
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, max_per_size: int = 8):
+        self.max_bytes = max_bytes
+        self.max_per_size = max_per_size
+        #: number of buffers served from the pool
+        self.hits = 0
+        #: number of buffers allocated because the pool had none
+        self.misses = 0
+        #: number of released buffers dropped over the limits
+        self.drops = 0
+        #: memory held by the pooled buffers
+        self.nbytes = 0
+        self._free: dict[t.Hashable, list[t.Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(map(len, self._free.values()))
+
+    def _take(self, key: t.Hashable, size: int) -> t.Any:
+        with self._lock:
+            free = self._free.get(key)
+            if not free:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.nbytes -= size
+            return free.pop()
+
+    def _put(self, key: t.Hashable, obj: t.Any, size: int) -> None:
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) >= self.max_per_size or self.nbytes + size > self.max_bytes:
+                self.drops += 1
+                return
+            free.append(obj)
+            self.nbytes += size
+
+    def size_class(self, size: int) -> int:
+        """The capacity of the buffers that hold ``size`` bytes."""
+        return max(self.min_size, 1 << max(size - 1, 0).bit_length())
+
+    def acquire(self, size: int) -> bytearray:
+        """Acquire a buffer of at least ``size`` bytes."""
+        capacity = self.size_class(size)
+        buf = self._take(('bytes', capacity), capacity)
+        if buf is None:
+            buf = bytearray(capacity)
+        return t.cast(bytearray, buf)
+
+    def release(self, buf: bytearray) -> None:
+        """Give a buffer of :meth:`acquire` back to the pool, the caller
+        must not use it anymore."""
+        capacity = len(buf)
+        if capacity != self.size_class(capacity):
+            # not a buffer of the pool, it would never be acquired
+            return
+        self._put(('bytes', capacity), buf, capacity)
+
+    def acquire_image(self, mode: str, size: tuple[int, int], color: ColorTuple) -> Image:
+        """Acquire an image filled with the color."""
+        im = self._take(('image', mode, size), _image_size(mode, size))
+        if im is None:
+            return createImage(mode, size, color)
+        im.paste(color, (0, 0) + size)
+        return t.cast(Image, im)
+
+    def release_image(self, im: Image) -> None:
+        """Give an image of :meth:`acquire_image` back to the pool, the
+        caller must not use it anymore."""
+        self._put(('image', im.mode, im.size), im, _image_size(im.mode, im.size))
+
+    def stats(self) -> dict[str, int]:
+        """The counters and the pooled buffers and bytes of the pool."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'drops': self.drops,
+                'buffers': sum(map(len, self._free.values())),
+                'nbytes': self.nbytes,
+            }
+
+    def clear(self) -> None:
+        """Drop every pooled buffer."""
+        with self._lock:
+            self._free.clear()
+            self.nbytes = 0
+
+
+def _image_size(mode: str, size: tuple[int, int]) -> int:
+    bands = 1 if mode in ('1', 'L', 'P') else 4
+    return size[0] * size[1] * bands
@@ -13,12 +13,34 @@ import os
 import copy
 import wave
 import struct
-import secrets
+import itertools
 import operator
-from functools import reduce
-
-
-__all__ = ['AudioCaptcha']
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from .instrument import Observer, stage
+from .rng import RandomSource, default_source
+from .voicepack import VoicePack
+
+if t.TYPE_CHECKING:
+    from .aio import AsyncRenderer
+    from .arena import BufferPool
+
+try:
+    from . import _speedups
+except ImportError:  # pragma: no cover
+    _speedups = None  # type: ignore[assignment]
+
+__all__ = [
+    'AudioCaptcha',
+    'VoiceBank',
+    'SampleFormat',
+    'AudioLayout',
+    'U8_8000',
+    'S16_16000',
+    'S16_22050',
+]
 
 WAVE_SAMPLE_RATE = 8000  # HZ
 WAVE_HEADER = bytearray(
@@ -28,63 +50,158 @@ WAVE_HEADER = bytearray(
 WAVE_HEADER_LENGTH = len(WAVE_HEADER) - 4
 DATA_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data')
 
+#: the modes of :func:`change_speed`
+RESAMPLE_MODES = ('nearest', 'linear')
+# the byte strings of every byte value
+_BYTES = [bytes((i,)) for i in range(256)]
+
+#: a wave body, the voices of a pack are views of the mapped file
+Voice = t.Union[bytearray, memoryview]
+
 
 def _read_wave_file(filepath: str) -> bytearray:
+    return _read_wave(filepath)[1]
+
+
+def _read_wave(filepath: str) -> t.Tuple['SampleFormat', bytearray]:
     w = wave.open(filepath)
     data = w.readframes(-1)
+    sample_format = SampleFormat(w.getframerate(), w.getsampwidth())
     w.close()
-    return bytearray(data)
+    return sample_format, bytearray(data)
 
 
-def change_speed(body: bytearray, speed: float = 1) -> bytearray:
-    """Change the voice speed of the wave body."""
+def change_speed(body: bytearray, speed: float = 1,
+                 mode: str = 'nearest') -> bytearray:
+    """Change the voice speed of the wave body.
+
+    :param body: the wave content body.
+    :param speed: the ratio of the output length to the input length.
+    :param mode: ``nearest`` repeats or drops samples, which is the classic
+                 behavior, ``linear`` interpolates between the samples.
+    """
     if speed == 1:
         return body
+    if mode not in RESAMPLE_MODES:
+        raise ValueError(f'Unknown resample mode: {mode!r}')
+
+    if _speedups is not None:
+        if mode == 'linear':
+            return _speedups.change_speed_linear(body, speed)
+        return _speedups.change_speed(body, speed)
+
+    if mode == 'linear':
+        return _change_speed_linear(body, speed)
 
     length = int(len(body) * speed)
-    rv = bytearray(length)
+    # the input sample i fills the output from int(i * speed) up to
+    # int((i + 1) * speed), with the steps accumulated as floats
+    steps = itertools.accumulate(itertools.repeat(speed, len(body)), initial=0.0)
+    bounds = list(map(int, steps))
+    counts = map(operator.sub, bounds[1:], bounds)
+    rv = bytearray(b''.join(map(operator.mul, map(_BYTES.__getitem__, body), counts)))
+    if len(rv) < length:
+        rv.extend(bytes(length - len(rv)))
+    else:
+        del rv[length:]
+    return rv
 
-    step: float = 0
-    for v in body:
-        i = int(step)
-        while i < int(step + speed) and i < length:
-            rv[i] = v
-            i += 1
-        step += speed
+
+def _change_speed_linear(body: bytearray, speed: float) -> bytearray:
+    length = int(len(body) * speed)
+    last = len(body) - 1
+    rv = bytearray(length)
+    for i in range(length):
+        x = i / speed
+        j = int(x)
+        a = body[j]
+        b = body[j + 1] if j < last else a
+        rv[i] = int(a + (b - a) * (x - j) + 0.5)
     return rv
 
 
-def patch_wave_header(body: bytearray) -> bytearray:
-    """Patch header to the given wave body.
+def create_wave_header(length: int,
+                       sample_format: t.Optional['SampleFormat'] = None) -> bytearray:
+    """Create the header of a wave body with the given length.
 
-    :param body: the wave content body, it should be bytearray.
+    :param length: the length of the wave content body.
+    :param sample_format: the format of the body, 8-bit 8kHz by default.
     """
-    length = len(body)
-
     padded = length + length % 2
     total = WAVE_HEADER_LENGTH + padded
 
-    header = copy.copy(WAVE_HEADER)
-    # fill the total length position
-    header[4:8] = bytearray(struct.pack('<I', total))
-    header += bytearray(struct.pack('<I', length))
+    if sample_format is None or sample_format == U8_8000:
+        header = copy.copy(WAVE_HEADER)
+        # fill the total length position
+        header[4:8] = struct.pack('<I', total)
+    else:
+        rate, width = sample_format
+        header = bytearray(struct.pack(
+            '<4sI4s4sIHHIIHH4s', b'RIFF', total, b'WAVE', b'fmt ', 16,
+            1, 1, rate, rate * width, width, width * 8, b'data',
+        ))
+    header += struct.pack('<I', length)
+    return header
+
+
+def join_wave(segments: t.Sequence[bytearray],
+              sample_format: t.Optional['SampleFormat'] = None) -> bytearray:
+    """Join the wave body segments into wave data, with a header.
+
+    The data is written into one preallocated buffer, the segments are
+    copied only once.
+    """
+    length = sum(map(len, segments))
+    header = create_wave_header(length, sample_format)
+    # the total length is even, the padding byte stays 0
+    data = bytearray(len(header) + length + length % 2)
+    data[:len(header)] = header
+    pos = len(header)
+    for segment in segments:
+        data[pos:pos + len(segment)] = segment
+        pos += len(segment)
+    return data
+
 
-    data = header + body
+def iter_wave(segments: t.Sequence[Voice],
+              chunk_size: int = 8192,
+              sample_format: t.Optional['SampleFormat'] = None) -> t.Iterator[bytes]:
+    """Iterate the wave data of the body segments in chunks.
 
-    # the total length is even
-    if length != padded:
-        data = data + bytearray([0])
+    The header is computed from the segment lengths up front, so that the
+    whole wave data is never held in memory at once.
+    """
+    length = sum(map(len, segments))
+    yield bytes(create_wave_header(length, sample_format))
+    for segment in segments:
+        view = memoryview(segment)
+        for i in range(0, len(view), chunk_size):
+            yield bytes(view[i:i + chunk_size])
+    if length % 2:
+        yield b'\x00'
 
-    return data
+
+def patch_wave_header(body: bytearray) -> bytearray:
+    """Patch header to the given wave body.
+
+    :param body: the wave content body, it should be bytearray.
+    """
+    return join_wave([body])
 
 
-def create_noise(length: int, level: int = 4) -> bytearray:
+def create_noise(length: int, level: int = 4,
+                 rng: t.Optional[RandomSource] = None) -> bytearray:
     """Create white noise for background"""
+    if rng is None:
+        rng = default_source
+    if _speedups is not None:
+        return _speedups.create_noise(length, level, rng.randbytes)
+
     noise = bytearray(length)
     adjust = 128 - int(level / 2)
     i = 0
     while i < length:
-        v = secrets.randbelow(257)
+        v = rng.randbelow(257)
         noise[i] = v % level + adjust
         i += 1
     return noise
@@ -92,18 +209,16 @@ def create_noise(length: int, level: int = 4) -> bytearray:
 
 def create_silence(length: int) -> bytearray:
     """Create a piece of silence."""
-    data = bytearray(length)
-    i = 0
-    while i < length:
-        data[i] = 128
-        i += 1
-    return data
+    return bytearray(b'\x80') * length
 
 
 def change_sound(body: bytearray, level: float = 1) -> bytearray:
     if level == 1:
         return body
 
+    if _speedups is not None:
+        return _speedups.change_sound(body, level)
+
     body = copy.copy(body)
     for i, v in enumerate(body):
         if v > 128:
@@ -120,6 +235,9 @@ def change_sound(body: bytearray, level: float = 1) -> bytearray:
 
 def mix_wave(src: bytearray, dst: bytearray) -> bytearray:
     """Mix two wave body into one."""
+    if _speedups is not None:
+        return _speedups.mix_wave(src, dst)
+
     if len(src) > len(dst):
         # output should be longer
         dst, src = src, dst
@@ -133,9 +251,268 @@ def mix_wave(src: bytearray, dst: bytearray) -> bytearray:
     return dst
 
 
-BEEP = _read_wave_file(os.path.join(DATA_DIR, 'beep.wav'))
-END_BEEP = change_speed(BEEP, 1.4)
-SILENCE = create_silence(int(WAVE_SAMPLE_RATE / 5))
+def mix_wave_into(dst: t.Union[bytearray, memoryview], src: bytearray,
+                  offset: int = 0) -> None:
+    """Mix a wave body into another one at the offset, in place.
+
+    Unlike :func:`mix_wave`, the length of ``dst`` never changes, the part
+    of ``src`` that overruns it is cut off, and ``src`` is not modified.
+    """
+    if _speedups is not None:
+        return _speedups.mix_wave_into(dst, src, offset)
+
+    view = memoryview(dst)[offset:offset + len(src)]
+    for i, dv in enumerate(view):
+        sv = src[i]
+        if sv < 128 and dv < 128:
+            view[i] = int(sv * dv / 128)
+        else:
+            view[i] = int(2 * (sv + dv) - sv * dv / 128 - 256)
+
+
+class SampleFormat(t.NamedTuple):
+    """The PCM format of the audio, mono 8-bit unsigned or 16-bit signed
+    samples. The primitives of the audio CAPTCHA are methods of it, which
+    work on the samples of this format.
+
+    The 16-bit format requires NumPy.
+    """
+    #: frames per second
+    rate: int
+    #: bytes of a sample, 1 or 2
+    width: int
+
+    def frames(self, body: Voice) -> int:
+        """The number of frames of the wave body."""
+        return len(body) // self.width
+
+    def silence(self, frames: int) -> bytearray:
+        if self.width == 1:
+            return create_silence(frames)
+        return bytearray(frames * 2)
+
+    def noise(self, frames: int, level: int = 4,
+              rng: t.Optional[RandomSource] = None) -> bytearray:
+        """White noise, ``level`` is the amplitude of 8-bit samples."""
+        if self.width == 1:
+            return create_noise(frames, level, rng)
+        if rng is None:
+            rng = default_source
+        _require_speedups()
+        return _speedups.create_noise_s16(frames, level, rng.randbytes)
+
+    def reverse(self, body: Voice) -> bytearray:
+        if self.width == 1:
+            rv = bytearray(body)
+            rv.reverse()
+            return rv
+        _require_speedups()
+        return _speedups.reverse_s16(body)
+
+    def change_speed(self, body: bytearray, speed: float = 1,
+                     mode: str = 'nearest') -> bytearray:
+        if self.width == 1:
+            return change_speed(body, speed, mode)
+        if speed == 1:
+            return body
+        if mode not in RESAMPLE_MODES:
+            raise ValueError(f'Unknown resample mode: {mode!r}')
+        _require_speedups()
+        return _speedups.change_speed_s16(body, speed, mode == 'linear')
+
+    def change_sound(self, body: bytearray, level: float = 1) -> bytearray:
+        if self.width == 1:
+            return change_sound(body, level)
+        if level == 1:
+            return body
+        _require_speedups()
+        return _speedups.change_sound_s16(body, level)
+
+    def mix_into(self, dst: t.Union[bytearray, memoryview], src: bytearray,
+                 offset: int = 0) -> None:
+        """Mix ``src`` into ``dst`` at the frame ``offset``, in place."""
+        if self.width == 1:
+            return mix_wave_into(dst, src, offset)
+        _require_speedups()
+        return _speedups.mix_wave_into_s16(dst, src, offset)
+
+    def convert(self, body: Voice, source: 'SampleFormat') -> Voice:
+        """Convert the wave body of the ``source`` format to this one."""
+        if source == self:
+            return body
+        if self.width == 1 and source.width == 1 and _speedups is None:
+            return change_speed(bytearray(body), self.rate / source.rate, 'linear')
+        _require_speedups()
+        return _speedups.convert(
+            body, source.width, source.rate, self.width, self.rate)
+
+
+def _require_speedups() -> None:
+    if _speedups is None:
+        raise RuntimeError('16-bit audio requires NumPy')
+
+
+#: 8-bit unsigned 8kHz, the classic format
+U8_8000 = SampleFormat(8000, 1)
+#: 16-bit signed 16kHz
+S16_16000 = SampleFormat(16000, 2)
+#: 16-bit signed 22.05kHz
+S16_22050 = SampleFormat(22050, 2)
+
+
+#: the sounds around the voices, loaded on the first access of the module
+#: attributes, or the first :meth:`AudioCaptcha.load`
+_ASSETS = ('BEEP', 'END_BEEP', 'SILENCE', 'INTRO')
+_assets: t.Dict[str, bytearray] = {}
+_assets_lock = threading.Lock()
+
+
+def _load_assets() -> t.Dict[str, bytearray]:
+    with _assets_lock:
+        if not _assets:
+            beep = _read_wave_file(os.path.join(DATA_DIR, 'beep.wav'))
+            silence = create_silence(int(WAVE_SAMPLE_RATE / 5))
+            _assets.update(
+                BEEP=beep,
+                END_BEEP=change_speed(beep, 1.4),
+                SILENCE=silence,
+                INTRO=beep + silence + beep + silence + beep,
+            )
+            # later accesses find the module attributes
+            globals().update(_assets)
+    return _assets
+
+
+def __getattr__(name: str) -> bytearray:
+    if name in _ASSETS:
+        return _load_assets()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _reset_assets_lock() -> None:
+    global _assets_lock
+    _assets_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_assets_lock)
+
+
+# discrete speeds and levels of the twisted voices and the background noises
+TWIST_SPEEDS = [(i + 90) / 100.0 for i in range(31)]
+TWIST_LEVELS = [(i + 80) / 100.0 for i in range(41)]
+NOISE_SPEEDS = [(i + 8) / 10.0 for i in range(9)]
+NOISE_LEVELS = [(i + 2) / 10.0 for i in range(5)]
+
+#: the voice library, sample format and resample mode, then the char, file,
+#: speed, level and reversed of a variant
+VariantKey = t.Tuple[str, SampleFormat, str, str, int, float, float, bool]
+
+
+class AudioLayout(t.NamedTuple):
+    """The placements of the sounds in the wave body of an audio CAPTCHA,
+    planned before any sample is written. Offsets are in frames.
+    """
+    #: frames of the wave body
+    length: int
+    #: the reversed voices of the background noise, by offset
+    noises: t.List[t.Tuple[int, bytearray]]
+    #: the voices of the characters, by offset
+    voices: t.List[t.Tuple[int, bytearray]]
+
+
+class VoiceBank:
+    """A bounded store of precomputed voice variants for AudioCaptcha.
+
+    Every voice a CAPTCHA speaks is one of the loaded wave files, maybe
+    reversed, with one of a few speeds and levels. The bank keeps these
+    variants, indexed by ``(char, file, speed, level, reversed)`` of a voice
+    library, sample format and resample mode, so that generating a CAPTCHA
+    only selects and mixes them. A bank can be shared by AudioCaptchas of
+    different libraries, formats and modes::
+
+        bank = VoiceBank(max_bytes=32 * 1024 * 1024)
+        captcha = AudioCaptcha(bank=bank)
+
+    Variants are computed lazily and the least recently used ones are
+    dropped once ``max_bytes`` is exceeded. With ``preload=True``, the bank
+    is filled up to ``max_bytes`` when :meth:`AudioCaptcha.load` is called.
+
+    :param max_bytes: the memory ceiling of the stored variants.
+    :param preload: compute variants at load time.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, preload: bool = False):
+        self.max_bytes = max_bytes
+        self.preload = preload
+        #: number of variants served from the bank
+        self.hits = 0
+        #: number of variants computed on demand
+        self.misses = 0
+        #: memory used by the stored variants
+        self.nbytes = 0
+        self._variants: t.OrderedDict[VariantKey, bytearray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._variants)
+
+    def __contains__(self, key: VariantKey) -> bool:
+        return key in self._variants
+
+    @property
+    def full(self) -> bool:
+        return self.nbytes >= self.max_bytes
+
+    def get(self, key: VariantKey, factory: t.Callable[[], bytearray]) -> bytearray:
+        """Get the variant of the key, compute it with factory if missing."""
+        with self._lock:
+            voice = self._variants.get(key)
+            if voice is not None:
+                self._variants.move_to_end(key)
+                self.hits += 1
+                return voice
+            self.misses += 1
+
+        voice = factory()
+        self.put(key, voice)
+        return voice
+
+    def put(self, key: VariantKey, voice: bytearray) -> None:
+        """Store a variant, evicting the least recently used ones."""
+        if len(voice) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._variants.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._variants[key] = voice
+            self.nbytes += len(voice)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._variants.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self) -> None:
+        """Drop all variants and reset the counters."""
+        with self._lock:
+            self._variants.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# the voices shared by every AudioCaptcha of the process, by voice library
+# and sample format
+_voices: t.Dict[t.Tuple[str, SampleFormat], t.Dict[str, t.Sequence[Voice]]] = {}
+_voices_lock = threading.Lock()
+
+
+def _reset_voices_lock() -> None:
+    global _voices_lock
+    _voices_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_voices_lock)
 
 
 class AudioCaptcha:
@@ -162,23 +539,73 @@ class AudioCaptcha:
     You should always use your own voice library::
 
         captcha = AudioCaptcha(voicedir='/path/to/voices')
+
+    A large voice library can be packed into one file, which is mapped
+    into memory instead of being read, see :mod:`captcha.voicepack`::
+
+        captcha = AudioCaptcha(voicedir='/path/to/voices.pack')
+
+    You can share a :class:`VoiceBank` to precompute the voice variants::
+
+        captcha = AudioCaptcha(voicedir='/path/to/voices', bank=VoiceBank())
+
+    :param voicedir: the voice data library directory, or a voice pack.
+    :param bank: an optional bank of precomputed voice variants.
+    :param rng: the source of randomness, see :mod:`captcha.rng`.
+    :param observer: a callable that receives the seconds of every stage,
+                     see :mod:`captcha.instrument`.
+
+    The voices are resampled to change their speed by ``resample``, see
+    :func:`change_speed`. Set it to ``linear`` for smoother voices.
+
+    The audio is 8-bit 8kHz by default, pass a ``sample_format`` such as
+    :data:`S16_16000` for 16-bit audio, which requires NumPy. The voices
+    are converted to the format when they are loaded.
+
+    With an ``arena``, see :class:`~captcha.arena.BufferPool`, the wave
+    body of :meth:`stream` and :meth:`write` is rendered into a recycled
+    buffer.
     """
-    def __init__(self, voicedir: t.Optional[str] = None):
+    resample: str = 'nearest'
+
+    def __init__(self, voicedir: t.Optional[str] = None,
+                 bank: t.Optional[VoiceBank] = None,
+                 rng: t.Optional[RandomSource] = None,
+                 observer: t.Optional[Observer] = None,
+                 sample_format: SampleFormat = U8_8000,
+                 arena: t.Optional['BufferPool'] = None):
         if voicedir is None:
             voicedir = DATA_DIR
+        if sample_format.width not in (1, 2):
+            raise ValueError('Sample width must be 1 or 2 bytes')
+        if sample_format.width == 2 and _speedups is None:
+            raise RuntimeError('16-bit audio requires NumPy')
 
         self._voicedir = voicedir
-        self._cache: t.Dict[str, t.List[bytearray]] = {}
+        self._bank = bank
+        self._rng = default_source if rng is None else rng
+        self.observer = observer
+        self.sample_format = sample_format
+        self.arena = arena
+        self._renderer: t.Optional['AsyncRenderer'] = None
+        self._cache: t.Dict[str, t.Sequence[Voice]] = {}
+        self._intro = bytearray()
+        self._end_beep = bytearray()
         self._choices: t.List[str] = []
+        self._voicepack: t.Optional[VoicePack] = None
 
     @property
     def choices(self) -> t.List[str]:
         """Available choices for characters to be generated."""
         if self._choices:
             return self._choices
-        for n in os.listdir(self._voicedir):
-            if len(n) == 1 and os.path.isdir(os.path.join(self._voicedir, n)):
-                self._choices.append(n)
+        if self.voicepack is not None:
+            self._choices = self.voicepack.choices
+            return self._choices
+        self._choices = [
+            n for n in sorted(os.listdir(self._voicedir))
+            if len(n) == 1 and os.path.isdir(os.path.join(self._voicedir, n))
+        ]
         return self._choices
 
     def random(self, length: int = 6) -> t.List[str]:
@@ -186,77 +613,219 @@ class AudioCaptcha:
 
         :param length: the return string length.
         """
-        return [secrets.choice(self.choices) for _ in range(length)]
+        return [self._rng.choice(self.choices) for _ in range(length)]
 
-    def load(self) -> None:
-        """Load voice data into memory."""
-        for name in self.choices:
-            self._load_data(name)
+    @property
+    def voicepack(self) -> t.Optional[VoicePack]:
+        """The voice pack, if ``voicedir`` is a pack file."""
+        if self._voicepack is None and os.path.isfile(self._voicedir):
+            self._voicepack = VoicePack(self._voicedir)
+        return self._voicepack
 
-    def _load_data(self, name: str) -> None:
-        dirname = os.path.join(self._voicedir, name)
-        data: t.List[bytearray] = []
-        for f in os.listdir(dirname):
-            filepath = os.path.join(dirname, f)
-            if f.endswith('.wav') and os.path.isfile(filepath):
-                data.append(_read_wave_file(filepath))
-        self._cache[name] = data
+    @property
+    def bank(self) -> t.Optional[VoiceBank]:
+        """The bank of precomputed voice variants, if any."""
+        return self._bank
 
-    def _twist_pick(self, key: str) -> bytearray:
-        voice = secrets.choice(self._cache[key])
+    @property
+    def renderer(self) -> 'AsyncRenderer':
+        """The renderer of :meth:`agenerate`, see :class:`captcha.aio.AsyncRenderer`."""
+        if self._renderer is None:
+            from .aio import AsyncRenderer
+            self._renderer = AsyncRenderer()
+        return self._renderer
+
+    @renderer.setter
+    def renderer(self, renderer: 'AsyncRenderer') -> None:
+        self._renderer = renderer
+
+    def load(self, reload: bool = False) -> None:
+        """Load voice data into memory.
 
-        # random change speed
-        speed = (secrets.randbelow(31) + 90) / 100.0
-        voice = change_speed(voice, speed)
+        The voices are shared by every AudioCaptcha of the process with the
+        same ``voicedir``, they are read only once unless ``reload``.
 
-        # random change sound
-        level = (secrets.randbelow(41) + 80) / 100.0
-        voice = change_sound(voice, level)
+        :param reload: read the voice library again.
+        """
+        key = (os.path.abspath(self._voicedir), self.sample_format)
+        cache = None if reload else _voices.get(key)
+        if cache is None:
+            if reload:
+                self._choices = []
+                self._voicepack = None
+            cache = {name: self._load_data(name) for name in self.choices}
+            with _voices_lock:
+                if reload:
+                    _voices[key] = cache
+                else:
+                    cache = _voices.setdefault(key, cache)
+        assets = _load_assets()
+        self._intro = bytearray(self.sample_format.convert(assets['INTRO'], U8_8000))
+        self._end_beep = bytearray(self.sample_format.convert(assets['END_BEEP'], U8_8000))
+        # assign at once, generate() may run in other threads
+        self._choices = list(cache)
+        self._cache = cache
+        if self._bank is not None and self._bank.preload:
+            self._preload_bank(self._bank)
+
+    def warmup(self) -> float:
+        """Load the voices and generate a CAPTCHA ahead of the first
+        request, return the seconds it took.
+
+        Call it in the master process of a pre-fork server, so that the
+        workers share the loaded voices.
+        """
+        start = time.perf_counter()
+        self.load()
+        self.generate(''.join(self.random(4)))
+        return time.perf_counter() - start
+
+    def _preload_bank(self, bank: VoiceBank) -> None:
+        # the small set of noise variants first, a CAPTCHA picks more of
+        # them than voices, then the twisted voices round-robin over the
+        # characters, so that a bank too small for all of them still covers
+        # every character
+        variants = [
+            (NOISE_SPEEDS, NOISE_LEVELS, True),
+            (TWIST_SPEEDS, TWIST_LEVELS, False),
+        ]
+        for speeds, levels, reverse in variants:
+            for speed in speeds:
+                for level in levels:
+                    for name in self.choices:
+                        for index in range(len(self._cache[name])):
+                            key = self._variant_key(name, index, speed, level, reverse)
+                            if key in bank:
+                                continue
+                            voice = self._make_variant(name, index, speed, level, reverse)
+                            if bank.nbytes + len(voice) > bank.max_bytes:
+                                # it would evict the preloaded variants
+                                return
+                            bank.put(key, voice)
+
+    def _load_data(self, name: str) -> t.Sequence[Voice]:
+        convert = self.sample_format.convert
+        pack = self.voicepack
+        if pack is not None:
+            source = SampleFormat(pack.framerate, pack.sampwidth)
+            return [convert(voice, source) for voice in pack.voices(name)]
+        dirname = os.path.join(self._voicedir, name)
+        data: t.List[Voice] = []
+        for f in sorted(os.listdir(dirname)):
+            filepath = os.path.join(dirname, f)
+            if f.endswith('.wav') and os.path.isfile(filepath):
+                source, body = _read_wave(filepath)
+                data.append(convert(body, source))
+        return data
+
+    def _make_variant(self, key: str, index: int, speed: float,
+                      level: float, reverse: bool) -> bytearray:
+        fmt = self.sample_format
+        voice = self._cache[key][index]
+        if reverse:
+            voice = fmt.reverse(voice)
+        elif not isinstance(voice, bytearray):
+            # the voices of a pack are read-only views
+            voice = bytearray(voice)
+        voice = fmt.change_speed(voice, speed, self.resample)
+        voice = fmt.change_sound(voice, level)
         return voice
 
-    def _noise_pick(self) -> bytearray:
-        key = secrets.choice(self.choices)
-        voice = secrets.choice(self._cache[key])
-        voice = copy.copy(voice)
-        voice.reverse()
+    def _variant_key(self, key: str, index: int, speed: float,
+                     level: float, reverse: bool) -> VariantKey:
+        voicedir = os.path.abspath(self._voicedir)
+        return (voicedir, self.sample_format, self.resample, key, index, speed, level, reverse)
 
-        speed = (secrets.randbelow(9) + 8) / 10.0
-        voice = change_speed(voice, speed)
+    def _variant(self, key: str, index: int, speed: float,
+                 level: float, reverse: bool) -> bytearray:
+        if self._bank is None:
+            return self._make_variant(key, index, speed, level, reverse)
+        return self._bank.get(
+            self._variant_key(key, index, speed, level, reverse),
+            lambda: self._make_variant(key, index, speed, level, reverse),
+        )
 
-        level = (secrets.randbelow(5) + 2) / 10.0
-        voice = change_sound(voice, level)
-        return voice
+    def _twist_pick(self, key: str) -> bytearray:
+        index = self._rng.randbelow(len(self._cache[key]))
+        # random change speed and sound
+        speed = self._rng.choice(TWIST_SPEEDS)
+        level = self._rng.choice(TWIST_LEVELS)
+        return self._variant(key, index, speed, level, False)
 
-    def create_background_noise(self, length: int, chars: str) -> bytearray:
-        noise = create_noise(length, 4)
+    def _noise_pick(self) -> bytearray:
+        key = self._rng.choice(self.choices)
+        index = self._rng.randbelow(len(self._cache[key]))
+        speed = self._rng.choice(NOISE_SPEEDS)
+        level = self._rng.choice(NOISE_LEVELS)
+        return self._variant(key, index, speed, level, True)
+
+    def _plan_noises(self, length: int) -> t.List[t.Tuple[int, bytearray]]:
+        noises = []
         pos = 0
         while pos < length:
             sound = self._noise_pick()
-            end = pos + len(sound) + 1
-            noise[pos:end] = mix_wave(sound, noise[pos:end])
-            pos = end + secrets.randbelow(int(WAVE_SAMPLE_RATE / 10) + 1)
+            noises.append((pos, sound))
+            pos += self.sample_format.frames(sound) + 1 + \
+                self._rng.randbelow(int(self.sample_format.rate / 10) + 1)
+        return noises
+
+    def create_background_noise(self, length: int, chars: str) -> bytearray:
+        """Create the background noise of ``length`` frames."""
+        fmt = self.sample_format
+        noise = fmt.noise(length, 4, self._rng)
+        for offset, sound in self._plan_noises(length):
+            fmt.mix_into(noise, sound, offset)
         return noise
 
+    def plan_layout(self, chars: str) -> AudioLayout:
+        """Pick the voices of the characters and the background noise,
+        and place them in a wave body of the exact length.
+
+        Every character is preceded by a pause of one to three seconds,
+        and the body ends right after the last voice.
+
+        :param chars: text to be generated.
+        """
+        fmt = self.sample_format
+        voices: t.List[t.Tuple[int, bytearray]] = []
+        pos = 0
+        with stage(self.observer, 'audio.twist'):
+            for c in chars:
+                voice = self._twist_pick(c)
+                pos += self._rng.randbelow(fmt.rate * 3 - fmt.rate + 1) + fmt.rate
+                voices.append((pos, voice))
+                pos += fmt.frames(voice) + 1
+            noises = self._plan_noises(pos)
+        return AudioLayout(pos, noises, voices)
+
+    def render_layout(self, layout: AudioLayout,
+                      body: t.Union[bytearray, memoryview]) -> None:
+        """Write the wave body of the layout into ``body``, which must be
+        exactly ``layout.length`` frames long.
+        """
+        fmt = self.sample_format
+        with stage(self.observer, 'audio.noise'):
+            body[:] = fmt.noise(layout.length, 4, self._rng)
+            for offset, sound in layout.noises:
+                fmt.mix_into(body, sound, offset)
+
+        with stage(self.observer, 'audio.mix'):
+            for offset, voice in layout.voices:
+                fmt.mix_into(body, voice, offset)
+
+    def create_wave_segments(self, chars: str) -> t.List[bytearray]:
+        """Create the wave body of the given characters, as a list of
+        segments which are not joined yet.
+
+        :param chars: text to be generated.
+        """
+        layout = self.plan_layout(chars)
+        bg = bytearray(layout.length * self.sample_format.width)
+        self.render_layout(layout, bg)
+        return [self._intro, bg, self._end_beep]
+
     def create_wave_body(self, chars: str) -> bytearray:
-        voices: t.List[bytearray] = []
-        inters: t.List[int] = []
-        for c in chars:
-            voices.append(self._twist_pick(c))
-            i = secrets.randbelow(WAVE_SAMPLE_RATE * 3 - WAVE_SAMPLE_RATE + 1) + WAVE_SAMPLE_RATE
-            inters.append(i)
-
-        durations = map(lambda a: len(a), voices)
-        length = max(durations) * len(chars) + reduce(operator.add, inters)
-        bg = self.create_background_noise(length, chars)
-
-        # begin
-        pos: int = inters[0]
-        for i, v in enumerate(voices):
-            end = pos + len(v) + 1
-            bg[pos:end] = mix_wave(v, bg[pos:end])
-            pos = end + inters[i]
-
-        return BEEP + SILENCE + BEEP + SILENCE + BEEP + bg + END_BEEP
+        return bytearray().join(self.create_wave_segments(chars))
 
     def generate(self, chars: str) -> bytearray:
         """Generate audio CAPTCHA data. The return data is a bytearray.
@@ -265,15 +834,104 @@ class AudioCaptcha:
         """
         if not self._cache:
             self.load()
-        body = self.create_wave_body(chars)
-        return patch_wave_header(body)
+        return self._render_wave(self.plan_layout(chars))
+
+    def _render_wave(self, layout: AudioLayout) -> bytearray:
+        # the wave data is allocated once, the body is rendered into it
+        intro, end_beep = self._intro, self._end_beep
+        size = layout.length * self.sample_format.width
+        length = len(intro) + size + len(end_beep)
+        # the total length is even, the padding byte stays 0
+        data = bytearray(len(WAVE_HEADER) + 4 + length + length % 2)
+        pos = len(WAVE_HEADER) + 4 + len(intro)
+        with memoryview(data) as view:
+            self.render_layout(layout, view[pos:pos + size])
+        with stage(self.observer, 'audio.header'):
+            data[:pos] = create_wave_header(length, self.sample_format) + intro
+            data[pos + size:pos + size + len(end_beep)] = end_beep
+        return data
+
+    def stream(self, chars: str, chunk_size: int = 8192) -> t.Iterator[bytes]:
+        """Generate audio CAPTCHA data as an iterator of chunks, e.g. for a
+        chunked HTTP response::
+
+            return Response(captcha.stream('1234'), mimetype='audio/wav')
 
-    def write(self, chars: str, output: str) -> None:
+        :param chars: text to be generated.
+        :param chunk_size: the maximum size of a chunk.
+        """
+        if not self._cache:
+            self.load()
+        return self._stream(chars, chunk_size)
+
+    def _stream(self, chars: str, chunk_size: int) -> t.Iterator[bytes]:
+        with self._render_body(self.plan_layout(chars)) as body:
+            segments = [self._intro, body, self._end_beep]
+            yield from iter_wave(segments, chunk_size, self.sample_format)
+
+    @contextmanager
+    def _render_body(self, layout: AudioLayout) -> t.Iterator[Voice]:
+        # a scratch wave body, which is recycled by the arena
+        size = layout.length * self.sample_format.width
+        if self.arena is None:
+            body = bytearray(size)
+            self.render_layout(layout, body)
+            yield body
+            return
+
+        buf = self.arena.acquire(size)
+        view = memoryview(buf)[:size]
+        try:
+            self.render_layout(layout, view)
+            yield view
+        finally:
+            view.release()
+            self.arena.release(buf)
+
+    async def agenerate(self, chars: str) -> bytearray:
+        """Generate audio CAPTCHA data without blocking the event loop.
+
+        The audio is generated by :attr:`renderer` in its executor.
+
+        :param chars: text to be generated.
+        """
+        return await self.renderer.run(self.generate, chars)
+
+    def generate_many(
+            self,
+            iterable: t.Iterable[str]) -> t.Iterator[t.Tuple[str, bytearray]]:
+        """Generate audio CAPTCHAs for each of the given strings lazily::
+
+            for chars, data in captcha.generate_many(codes):
+                save(chars, data)
+
+        The voice data is loaded once for the whole batch.
+
+        :param iterable: texts to be generated.
+        """
+        if not self._cache:
+            self.load()
+        for chars in iterable:
+            yield chars, self._render_wave(self.plan_layout(chars))
+
+    def write(self, chars: str, output: t.Union[str, 'os.PathLike[str]', t.BinaryIO]) -> None:
         """Generate and write audio CAPTCHA data to the output.
 
         :param chars: text to be generated.
-        :param output: output destionation.
+        :param output: output destionation, a file path or a file object.
         """
-        data = self.generate(chars)
-        with open(output, 'wb') as f:
-            f.write(data)
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, 'wb') as f:
+                self.write(chars, f)
+            return
+
+        if not self._cache:
+            self.load()
+        with self._render_body(self.plan_layout(chars)) as body:
+            segments = [self._intro, body, self._end_beep]
+            length = sum(map(len, segments))
+            output.write(create_wave_header(length, self.sample_format))
+            for segment in segments:
+                output.write(segment)
+        if length % 2:
+            output.write(b'\x00')
@@ -0,0 +1,437 @@
+# coding: utf-8
+"""
+    captcha.diskcache
+    ~~~~~~~~~~~~~~~~~
+
+    A cache of rendered CAPTCHAs on disk, e.g. for a static fallback tier
+    which serves pre-rendered challenges. Fill it with
+    :meth:`ImageCaptcha.write <captcha.image.ImageCaptcha.write>` or
+    :meth:`AudioCaptcha.write <captcha.audio.AudioCaptcha.write>`::
+
+        cache = DiskCache('/var/cache/captcha')
+        with cache.open(answer) as f:
+            captcha.write(answer, f)
+
+    Or pre-fill it in worker processes with::
+
+        python -m captcha.diskcache prefill /var/cache/captcha -n 10000
+
+    The cache is a directory of shards, every shard is a single append-only
+    pack file of ``(key, answer hash, expires, length)`` records, each one
+    followed by its payload. The key is the content hash of the payload,
+    which selects the shard. The records are scanned into an index when a
+    shard is loaded, and the payloads are served as views of the mapped
+    file, without a copy::
+
+        entry = cache.random()
+        sock.sendall(entry.payload)
+        ...
+        cache.verify(entry.key, answer)
+
+    A cache has a single writer process, and any number of readers, which
+    pick up new entries with :meth:`DiskCache.refresh`. Expired entries are
+    dropped by :meth:`DiskCache.compact`, in the writer or in another
+    process with::
+
+        python -m captcha.diskcache compact /var/cache/captcha
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import hmac
+import mmap
+import os
+import string
+import struct
+import sys
+import threading
+import time
+import typing as t
+from io import BytesIO
+from .rng import RandomSource, default_source
+
+__all__ = ['DiskCache', 'CacheEntry']
+
+MAGIC = b'CAPCACHE'
+VERSION = 1
+#: magic, version, salt of the answer hashes
+HEADER = struct.Struct('<8sH16s')
+#: key, answer hash, expires, length of the payload
+RECORD = struct.Struct('<16s32sdI')
+
+
+class CacheEntry(t.NamedTuple):
+    #: the content hash of the payload, in hex
+    key: str
+    #: the time the entry expires, in seconds since the epoch
+    expires: float
+    #: the CAPTCHA data, a view of the mapped pack file
+    payload: memoryview
+
+
+class _Record(t.NamedTuple):
+    offset: int
+    length: int
+    answer: bytes
+    expires: float
+
+
+class _Shard:
+    def __init__(self, path: str):
+        self.path = path
+        self.salt = b''
+        self.records: dict[bytes, _Record] = {}
+        #: the keys of the records, for random picks
+        self.keys: list[bytes] = []
+        self._inode = -1
+        self._end = 0
+        self._mmap: mmap.mmap | None = None
+        self._writer: t.BinaryIO | None = None
+        if not os.path.exists(path):
+            self._create(path, os.urandom(16))
+        self.load()
+
+    @staticmethod
+    def _create(path: str, salt: bytes) -> None:
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, salt))
+        os.replace(tmp, path)
+
+    def answer_hash(self, answer: str) -> bytes:
+        return hashlib.sha256(self.salt + answer.encode('utf-8')).digest()
+
+    def load(self) -> None:
+        """Scan the records appended since the last load."""
+        st = os.stat(self.path)
+        if st.st_ino != self._inode:
+            # a new shard, or replaced by compaction
+            self.close()
+            self._inode = st.st_ino
+            self.records = {}
+            self.keys = []
+            self._end = HEADER.size
+        if self._mmap is None or len(self._mmap) < st.st_size:
+            self._remap()
+
+        mm = self._mmap
+        assert mm is not None
+        if self._end == HEADER.size:
+            magic, version, salt = HEADER.unpack_from(mm)
+            if magic != MAGIC:
+                raise ValueError(f'Not a CAPTCHA cache: {self.path}')
+            if version != VERSION:
+                raise ValueError(f'Unsupported CAPTCHA cache version: {version}')
+            self.salt = salt
+
+        pos = self._end
+        size = len(mm)
+        while pos + RECORD.size <= size:
+            key, answer, expires, length = RECORD.unpack_from(mm, pos)
+            offset = pos + RECORD.size
+            if offset + length > size:
+                # an append in progress, or torn by a crash
+                break
+            if key not in self.records:
+                self.keys.append(key)
+            self.records[key] = _Record(offset, length, answer, expires)
+            pos = offset + length
+        self._end = pos
+
+    def _remap(self) -> None:
+        # the views of the previous map keep it alive
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def payload(self, record: _Record) -> memoryview:
+        if self._mmap is None or len(self._mmap) < record.offset + record.length:
+            self._remap()
+        assert self._mmap is not None
+        return memoryview(self._mmap)[record.offset:record.offset + record.length]
+
+    def append(self, key: bytes, answer: bytes, expires: float, payload: bytes) -> None:
+        if os.stat(self.path).st_ino != self._inode:
+            # replaced by the compaction of another process, the writer
+            # would append to the unlinked file
+            self.load()
+        if key in self.records:
+            # the very same content
+            return
+        if self._writer is None:
+            self._writer = open(self.path, 'r+b')
+            # drop a torn record, it would hide the appended ones
+            self._writer.truncate(self._end)
+        writer = self._writer
+        writer.seek(self._end)
+        writer.write(RECORD.pack(key, answer, expires, len(payload)))
+        writer.write(payload)
+        writer.flush()
+        offset = self._end + RECORD.size
+        self.records[key] = _Record(offset, len(payload), answer, expires)
+        self.keys.append(key)
+        self._end = offset + len(payload)
+
+    def compact(self, now: float) -> int:
+        # the entries appended by the writer process
+        self.load()
+        live = [(k, r) for k, r in self.records.items() if r.expires > now]
+        removed = len(self.records) - len(live)
+        if not removed:
+            return 0
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.salt))
+            for key, record in live:
+                f.write(RECORD.pack(key, record.answer, record.expires, record.length))
+                f.write(self.payload(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.load()
+        return removed
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        # the map is closed when its last view is released
+        self._mmap = None
+
+
+class _EntryWriter(BytesIO):
+    # a file object that adds its content to the cache when it is closed
+    def __init__(self, cache: DiskCache, answer: str, ttl: float | None):
+        super().__init__()
+        self._cache = cache
+        self._answer = answer
+        self._ttl = ttl
+        self._discard = False
+        #: the key of the entry, once it is closed
+        self.key: str | None = None
+
+    def close(self) -> None:
+        if not self.closed and not self._discard:
+            self.key = self._cache.put(self._answer, self.getvalue(), self._ttl)
+        super().close()
+
+    def __exit__(self, exc_type: t.Any, *args: t.Any) -> None:
+        # an incomplete CAPTCHA is discarded
+        self._discard = exc_type is not None
+        self.close()
+
+    def __del__(self) -> None:
+        # collected without close(), e.g. dropped by an error
+        self._discard = True
+        self.close()
+
+
+class DiskCache:
+    """A sharded cache of rendered CAPTCHAs on disk.
+
+    :param path: the directory of the cache, it is created if missing.
+    :param shards: the number of shards of a new cache, an existing cache
+                   keeps its own.
+    :param ttl: the default seconds an entry can be served.
+    """
+    def __init__(self, path: str, shards: int = 16, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+        names = sorted(n for n in os.listdir(path) if n.startswith('shard-') and n.endswith('.pack'))
+        if not names:
+            names = [f'shard-{i:03d}.pack' for i in range(shards)]
+        self._shards = [_Shard(os.path.join(path, n)) for n in names]
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> DiskCache:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(len(shard.keys) for shard in self._shards)
+
+    def _shard(self, key: bytes) -> _Shard:
+        return self._shards[int.from_bytes(key[:4], 'little') % len(self._shards)]
+
+    def open(self, answer: str, ttl: float | None = None) -> t.BinaryIO:
+        """A writable file object, its content is added to the cache as the
+        CAPTCHA of ``answer`` when it is closed without an error. A file
+        object collected without being closed is discarded.
+
+        :param answer: the answer of the CAPTCHA.
+        :param ttl: seconds the entry can be served, default to :attr:`ttl`.
+        """
+        return _EntryWriter(self, answer, ttl)
+
+    def put(self, answer: str, payload: bytes, ttl: float | None = None) -> str:
+        """Add a CAPTCHA to the cache, return its key.
+
+        :param answer: the answer of the CAPTCHA.
+        :param payload: the CAPTCHA data.
+        :param ttl: seconds the entry can be served, default to :attr:`ttl`.
+        """
+        digest = hashlib.sha256(payload).digest()[:16]
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        shard = self._shard(digest)
+        with self._lock:
+            shard.append(digest, shard.answer_hash(answer), expires, payload)
+        return digest.hex()
+
+    def _lookup(self, key: str, now: float) -> tuple[_Shard, _Record] | None:
+        try:
+            digest = bytes.fromhex(key)
+        except ValueError:
+            return None
+        shard = self._shard(digest)
+        record = shard.records.get(digest)
+        if record is None or record.expires <= now:
+            return None
+        return shard, record
+
+    def get(self, key: str) -> memoryview | None:
+        """The payload of the entry, ``None`` if it is missing or expired."""
+        found = self._lookup(key, time.time())
+        if found is None:
+            return None
+        shard, record = found
+        return shard.payload(record)
+
+    def verify(self, key: str, answer: str) -> bool:
+        """Check the answer of an entry, expired entries never pass."""
+        found = self._lookup(key, time.time())
+        if found is None:
+            return False
+        shard, record = found
+        return hmac.compare_digest(shard.answer_hash(answer), record.answer)
+
+    def random(self, rng: RandomSource | None = None) -> CacheEntry:
+        """Pick a random entry that has not expired.
+
+        :param rng: the source of randomness, see :mod:`captcha.rng`.
+        """
+        if rng is None:
+            rng = default_source
+        now = time.time()
+        total = len(self)
+        # sampling is cheap while most entries are alive
+        for _ in range(8 if total else 0):
+            index = rng.randbelow(total)
+            for shard in self._shards:
+                if index < len(shard.keys):
+                    break
+                index -= len(shard.keys)
+            digest = shard.keys[index]
+            record = shard.records[digest]
+            if record.expires > now:
+                return CacheEntry(digest.hex(), record.expires, shard.payload(record))
+
+        with self._lock:
+            live = [
+                (shard, digest, record)
+                for shard in self._shards
+                for digest, record in shard.records.items()
+                if record.expires > now
+            ]
+        if not live:
+            raise KeyError('No entry in the CAPTCHA cache')
+        shard, digest, record = rng.choice(live)
+        return CacheEntry(digest.hex(), record.expires, shard.payload(record))
+
+    def refresh(self) -> None:
+        """Load the entries added, or compacted, by the writer process."""
+        with self._lock:
+            for shard in self._shards:
+                shard.load()
+
+    def compact(self, now: float | None = None) -> int:
+        """Rewrite the shards without the expired entries, return the number
+        of dropped entries. The payloads already served stay valid.
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            return sum(shard.compact(now) for shard in self._shards)
+
+    def close(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.close()
+
+
+def prefill(cache: DiskCache, count: int, audio: bool = False, length: int = 4,
+            workers: int | None = None, **options: t.Any) -> int:
+    """Render ``count`` CAPTCHAs in worker processes into the cache, return
+    the number of added entries.
+
+    :param cache: the cache to fill.
+    :param count: the number of CAPTCHAs.
+    :param audio: render audio CAPTCHAs instead of images.
+    :param length: the length of the answers.
+    :param workers: the number of worker processes, default to CPU count.
+    :param options: extra parameters of ``ImageCaptcha.generate``.
+    """
+    from .audio import AudioCaptcha
+    from .image import ImageCaptcha
+    from .parallel import ParallelCaptcha
+
+    if audio:
+        alphabet: t.Sequence[str] = AudioCaptcha().choices
+    else:
+        alphabet = string.digits + string.ascii_uppercase
+    rng = default_source
+    answers = (''.join(rng.choice(alphabet) for _ in range(length)) for _ in range(count))
+    factory = AudioCaptcha if audio else ImageCaptcha
+    added = 0
+    with ParallelCaptcha(factory, max_workers=workers) as pool:
+        for answer, payload in pool.generate_many(answers, **options):
+            cache.put(answer, payload)
+            added += 1
+    return added
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m captcha.diskcache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    prefill_parser = commands.add_parser('prefill', help='render CAPTCHAs into a cache')
+    prefill_parser.add_argument('path')
+    prefill_parser.add_argument('-n', '--count', type=int, default=1000)
+    prefill_parser.add_argument('--audio', action='store_true', help='render audio CAPTCHAs')
+    prefill_parser.add_argument('--length', type=int, default=4)
+    prefill_parser.add_argument('--format', default='png', help='image file format')
+    prefill_parser.add_argument('--ttl', type=float, default=3600)
+    prefill_parser.add_argument('--shards', type=int, default=16)
+    prefill_parser.add_argument('-j', '--workers', type=int, default=None)
+    compact_parser = commands.add_parser('compact', help='drop the expired entries')
+    compact_parser.add_argument('path')
+    info_parser = commands.add_parser('info', help='show the entries of a cache')
+    info_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'prefill':
+        options = {} if args.audio else {'format': args.format}
+        with DiskCache(args.path, shards=args.shards, ttl=args.ttl) as cache:
+            start = time.perf_counter()
+            count = prefill(cache, args.count, args.audio, args.length, args.workers, **options)
+            seconds = time.perf_counter() - start
+        print(f'{count} CAPTCHAs added to {args.path} in {seconds:.1f}s')
+        return 0
+
+    with DiskCache(args.path) as cache:
+        if args.command == 'compact':
+            print(f'{cache.compact()} expired entries dropped')
+            return 0
+        now = time.time()
+        live = sum(
+            1 for shard in cache._shards
+            for record in shard.records.values() if record.expires > now
+        )
+        size = sum(os.path.getsize(shard.path) for shard in cache._shards)
+        print(f'{len(cache._shards)} shards, {len(cache)} entries, {live} alive, {size} bytes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,24 +7,315 @@
 """
 
 from __future__ import annotations
+import math
 import os
-import secrets
+import string
+import threading
+import time
 import typing as t
-from PIL.Image import new as createImage, Image, Transform, Resampling
+from collections import OrderedDict
+from PIL.Image import new as createImage, Image, Transform, Resampling, Quantize
 from PIL.ImageDraw import Draw, ImageDraw
 from PIL.ImageFilter import SMOOTH
 from PIL.ImageFont import FreeTypeFont, truetype
 from io import BytesIO
+from .arena import BufferPool
+from .instrument import Observer, stage
+from .rng import RandomSource, default_source
 
-__all__ = ['ImageCaptcha']
+if t.TYPE_CHECKING:
+    from .aio import AsyncRenderer
+
+__all__ = ['ImageCaptcha', 'GlyphCache', 'NoiseAtlas', 'OutputProfile', 'PROFILES']
 
 
 ColorTuple = t.Union[t.Tuple[int, int, int], t.Tuple[int, int, int, int]]
+IO = t.TypeVar('IO', bound=t.IO[bytes])
 
 DATA_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data')
 DEFAULT_FONTS = [os.path.join(DATA_DIR, 'DroidSansMono.ttf')]
 
 
+class Glyph(t.NamedTuple):
+    #: text bbox size of the character, as used for warping
+    width: float
+    height: float
+    #: coverage of the rendered character, cropped to its bbox
+    mask: Image
+    #: 255 wherever the character covers a pixel
+    stencil: Image
+
+
+class GlyphCache:
+    """A bounded cache of rendered character masks.
+
+    Rendering a character with FreeType is the most expensive step of
+    drawing it. The rendered masks are kept by ``(font, size, char)``, and
+    the color is applied to them when a CAPTCHA is drawn.
+
+    :param maxsize: the maximum number of masks to keep.
+    """
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._glyphs: OrderedDict[tuple[str, float, str], Glyph] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    def get(self, c: str, font: FreeTypeFont, draw: ImageDraw) -> Glyph:
+        """Get the glyph of the character, render it if missing."""
+        key = (str(font.path), font.size, c)
+        with self._lock:
+            glyph = self._glyphs.get(key)
+            if glyph is not None:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return glyph
+            self.misses += 1
+
+        glyph = self.render(c, font, draw)
+        with self._lock:
+            self._glyphs[key] = glyph
+            while len(self._glyphs) > self.maxsize:
+                self._glyphs.popitem(last=False)
+        return glyph
+
+    @staticmethod
+    def render(c: str, font: FreeTypeFont, draw: ImageDraw) -> Glyph:
+        _, _, w, h = draw.multiline_textbbox((1, 1), c, font=font)
+        pad = _GLYPH_PADDING
+        mask = createImage('L', (int(w) + pad, int(h) + pad))
+        Draw(mask).text((pad, pad), c, font=font, fill=255)
+        bbox = mask.getbbox()
+        if bbox is None:
+            # whitespace
+            mask = createImage('L', (int(w), int(h)))
+        else:
+            mask = mask.crop(bbox)
+        stencil = mask.point(_STENCIL_TABLE)
+        return Glyph(w, h, mask, stencil)
+
+    @staticmethod
+    def colorize(glyph: Glyph, color: ColorTuple) -> Image:
+        """Create the RGBA image of the glyph with the given color."""
+        im = createImage('RGBA', glyph.mask.size)
+        im.paste(color, mask=glyph.stencil)
+        opacity = color[3] if len(color) == 4 else 255
+        alpha = glyph.mask
+        if opacity != 255:
+            # scaled for every paste, the cache holds one mask per glyph
+            alpha = alpha.point([(i * opacity + 127) // 255 for i in range(256)])
+        im.putalpha(alpha)
+        return im
+
+    @staticmethod
+    def level(glyph: Glyph, level: int) -> Image:
+        """The stencil of the glyph, scaled to ``level`` for pasting."""
+        if level == 255:
+            return glyph.stencil
+        return glyph.stencil.point([0] + [level] * 255)
+
+
+class NoiseAtlas:
+    """Pre-rasterized masks of the noise dots and curves.
+
+    Drawing the noise is many small calls of :class:`PIL.ImageDraw.Draw`.
+    The atlas draws ``variants`` masks of each noise layer once, then every
+    CAPTCHA pastes a random mask at a random offset, one paste per layer.
+
+    The dot masks are twice the size of the image, so that any window of
+    it has about ``number`` dots.
+
+    :param size: the size of the CAPTCHA images.
+    :param variants: the number of masks of each layer.
+    :param width: the width of the dots.
+    :param number: the number of dots in an image.
+    :param rng: the source of randomness to draw the masks.
+    """
+    def __init__(
+            self,
+            size: tuple[int, int],
+            variants: int = 32,
+            width: int = 3,
+            number: int = 30,
+            rng: RandomSource | None = None):
+        self.size = size
+        self.variants = variants
+        self.width = width
+        self.number = number
+        self._rng = default_source if rng is None else rng
+        self._dots: list[Image] = []
+        self._curves: list[Image] = []
+
+    @property
+    def dots(self) -> list[Image]:
+        if not self._dots:
+            w, h = self.size
+            masks = []
+            for _ in range(self.variants):
+                mask = createImage('1', (w * 2, h * 2))
+                ImageCaptcha.create_noise_dots(
+                    mask, 255, self.width, self.number * 4, self._rng)
+                masks.append(mask)
+            self._dots = masks
+        return self._dots
+
+    @property
+    def curves(self) -> list[Image]:
+        if not self._curves:
+            masks = []
+            for _ in range(self.variants):
+                mask = createImage('1', self.size)
+                ImageCaptcha.create_noise_curve(mask, 255, self._rng)
+                masks.append(mask)
+            self._curves = masks
+        return self._curves
+
+    def draw_dots(self, image: Image, color: ColorTuple,
+                  rng: RandomSource | None = None) -> Image:
+        """Paste the noise dots of the given color onto the image."""
+        if rng is None:
+            rng = self._rng
+        mask = rng.choice(self.dots)
+        w, h = self.size
+        x = -rng.randbelow(w + 1)
+        y = -rng.randbelow(h + 1)
+        image.paste(color[:3], (x, y, x + w * 2, y + h * 2), mask)
+        return image
+
+    def draw_curve(self, image: Image, color: ColorTuple,
+                   rng: RandomSource | None = None) -> Image:
+        """Paste a noise curve of the given color onto the image."""
+        if rng is None:
+            rng = self._rng
+        mask = rng.choice(self.curves)
+        w, h = self.size
+        x = rng.randbelow(w // 5 + 1) - w // 10
+        y = rng.randbelow(h // 5 + 1) - h // 10
+        image.paste(color[:3], (x, y, x + w, y + h), mask)
+        return image
+
+
+class OutputProfile(t.NamedTuple):
+    """The encoder settings of the generated images."""
+    #: image file format
+    format: str
+    #: quantize the image to a palette of this many colors, 0 to keep RGB
+    colors: int = 0
+    #: keyword arguments of :meth:`PIL.Image.Image.save`
+    options: t.Mapping[str, t.Any] = {}
+
+    def save(self, im: Image, out: str | t.IO[bytes]) -> None:
+        """Encode the image into the file path or writable binary file."""
+        if self.colors:
+            im = im.quantize(self.colors, Quantize.FASTOCTREE)
+        im.save(out, format=self.format, **self.options)
+
+
+#: the built-in profiles, from a noisy 160x60 CAPTCHA (bytes, encode time):
+PROFILES: dict[str, OutputProfile] = {
+    # 6.0KB, 1.7ms
+    'png': OutputProfile('png'),
+    # 6.8KB, 0.85ms: the fastest zlib level, with run-length strategy
+    'png-fast': OutputProfile('png', options={'compress_level': 1, 'compress_type': 3}),
+    # 1.5KB, 1.1ms
+    'png-palette': OutputProfile('png', colors=16),
+    # 2.3KB, 0.09ms
+    'jpeg': OutputProfile('jpeg', options={'quality': 75, 'subsampling': '4:2:0'}),
+    # 2.0KB, 0.08ms
+    'jpeg-small': OutputProfile('jpeg', options={'quality': 60, 'subsampling': '4:2:0'}),
+    # 1.4KB, 1.9ms
+    'webp': OutputProfile('webp', options={'quality': 80, 'method': 4}),
+    # 1.0KB, 3.8ms
+    'webp-small': OutputProfile('webp', options={'quality': 60, 'method': 6}),
+}
+
+
+def _get_profile(format: str, profile: str | OutputProfile | None) -> OutputProfile:
+    if profile is None:
+        return OutputProfile(format)
+    if isinstance(profile, str):
+        return PROFILES[profile]
+    return profile
+
+
+_STENCIL_TABLE = [0] + [255] * 255
+# room for the characters drawn over the left or top edge of their bbox
+_GLYPH_PADDING = 8
+
+
+def _compose_quad(
+        size: tuple[int, int],
+        angle: float,
+        resized: tuple[float, float],
+        data: tuple[float, ...]) -> list[float]:
+    """Map the QUAD corners of an image, which has been rotated with
+    ``expand=True`` and then resized, back to the original image.
+
+    An affine map of a bilinear map is still bilinear, so a single QUAD
+    transform with the mapped corners does the rotate, resize and warp.
+    """
+    # the same inverse matrix as Image.rotate
+    w, h = size
+    a = -math.radians(angle)
+    cos = round(math.cos(a), 15)
+    sin = round(math.sin(a), 15)
+    cx, cy = w / 2, h / 2
+    c = cos * -cx + sin * -cy + cx
+    f = -sin * -cx + cos * -cy + cy
+    xs = [cos * x + sin * y + c for x, y in ((0, 0), (w, 0), (w, h), (0, h))]
+    ys = [-sin * x + cos * y + f for x, y in ((0, 0), (w, 0), (w, h), (0, h))]
+    nw = math.ceil(max(xs)) - math.floor(min(xs))
+    nh = math.ceil(max(ys)) - math.floor(min(ys))
+    tx, ty = -(nw - w) / 2, -(nh - h) / 2
+    c, f = cos * tx + sin * ty + c, -sin * tx + cos * ty + f
+
+    sx = nw / resized[0]
+    sy = nh / resized[1]
+    corners = []
+    for i in range(0, len(data), 2):
+        x = data[i] * sx
+        y = data[i + 1] * sy
+        corners.append(cos * x + sin * y + c)
+        corners.append(-sin * x + cos * y + f)
+    return corners
+
+
+def _luminance(color: ColorTuple) -> int:
+    # the same weights as converting RGB to L
+    r, g, b = color[:3]
+    return (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16
+
+
+# the fonts shared by every ImageCaptcha of the process, by (path, size)
+_fonts: dict[tuple[str, int], FreeTypeFont] = {}
+_fonts_lock = threading.Lock()
+
+
+def _load_font(path: str, size: int) -> FreeTypeFont:
+    key = (path, size)
+    font = _fonts.get(key)
+    if font is None:
+        with _fonts_lock:
+            font = _fonts.get(key)
+            if font is None:
+                font = truetype(path, size)
+                _fonts[key] = font
+    return font
+
+
+def _reset_fonts_lock() -> None:
+    global _fonts_lock
+    _fonts_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_fonts_lock)
+
+
 class ImageCaptcha:
     """Create an image CAPTCHA.
 
@@ -44,6 +335,27 @@ class ImageCaptcha:
     :param height: The height of the CAPTCHA image.
     :param fonts: Fonts to be used to generate CAPTCHA images.
     :param font_sizes: Random choose a font size from this parameters.
+    :param rng: the source of randomness, see :mod:`captcha.rng`.
+    :param observer: a callable that receives the seconds of every stage,
+                     see :mod:`captcha.instrument`.
+    :param arena: a :class:`~captcha.arena.BufferPool` to recycle the
+                  canvas of the images, which is not returned to callers.
+
+    The rendered characters are cached, up to ``glyph_cache_size`` of them.
+    Set it to ``0`` to render every character with FreeType.
+
+    With ``fused_warp`` enabled, the rotation, scale and warp of every
+    character are done by a single transform of its cached mask, which
+    is much cheaper, but the edges are not identical to the classic
+    rendering.
+
+    With ``batch_composite`` enabled, the characters are placed on a single
+    mask layer, which is blended into the image at once, instead of one
+    character after another. It is the same image with ``fused_warp``, up
+    to rounding, and close to the classic compositing without it.
+
+    The noise is drawn for every CAPTCHA by default. Set ``noise_variants``
+    to paste it from a :class:`NoiseAtlas` of that many variants instead.
     """
     lookup_table: list[int] = [int(i * 1.97) for i in range(256)]
     character_offset_dx: tuple[int, int] = (0, 4)
@@ -53,54 +365,125 @@ class ImageCaptcha:
     character_warp_dy: tuple[float, float] = (0.2, 0.3)
     word_space_probability: float = 0.5
     word_offset_dx: float = 0.25
+    glyph_cache_size: int = 512
+    fused_warp: bool = False
+    batch_composite: bool = False
+    noise_variants: int = 0
 
     def __init__(
             self,
             width: int = 160,
             height: int = 60,
             fonts: list[str] | None = None,
-            font_sizes: tuple[int, ...] | None = None):
+            font_sizes: tuple[int, ...] | None = None,
+            rng: RandomSource | None = None,
+            observer: Observer | None = None,
+            arena: BufferPool | None = None):
         self._width = width
         self._height = height
         self._fonts = fonts or DEFAULT_FONTS
         self._font_sizes = font_sizes or (42, 50, 56)
         self._truefonts: list[FreeTypeFont] = []
+        self._rng = default_source if rng is None else rng
+        self.observer = observer
+        self.arena = arena
+        self._glyphs: GlyphCache | None = None
+        self._noise_atlas: NoiseAtlas | None = None
+        self._textdraw: ImageDraw | None = None
+        self._renderer: AsyncRenderer | None = None
 
     @property
     def truefonts(self) -> list[FreeTypeFont]:
         if self._truefonts:
             return self._truefonts
         self._truefonts = [
-            truetype(n, s)
+            _load_font(n, s)
             for n in self._fonts
             for s in self._font_sizes
         ]
         return self._truefonts
 
+    def warmup(self, chars: str = string.digits + string.ascii_letters) -> float:
+        """Load the fonts, render the characters and encode a CAPTCHA
+        ahead of the first request, return the seconds it took.
+
+        The fonts are shared by every ImageCaptcha of the process. Call it
+        in the master process of a pre-fork server, so that the workers
+        share the loaded fonts and rendered characters.
+
+        :param chars: the characters to render.
+        """
+        start = time.perf_counter()
+        draw = self.textdraw
+        if self.glyph_cache_size:
+            for font in self.truefonts:
+                for c in chars:
+                    self.glyphs.get(c, font, draw)
+        self.generate(chars[:4])
+        return time.perf_counter() - start
+
+    @property
+    def glyphs(self) -> GlyphCache:
+        if self._glyphs is None:
+            self._glyphs = GlyphCache(self.glyph_cache_size)
+        return self._glyphs
+
+    @property
+    def noise_atlas(self) -> NoiseAtlas:
+        if self._noise_atlas is None:
+            self._noise_atlas = NoiseAtlas(
+                (self._width, self._height), self.noise_variants, rng=self._rng)
+        return self._noise_atlas
+
+    @property
+    def renderer(self) -> AsyncRenderer:
+        """The renderer of :meth:`agenerate`, see :class:`captcha.aio.AsyncRenderer`."""
+        if self._renderer is None:
+            from .aio import AsyncRenderer
+            self._renderer = AsyncRenderer()
+        return self._renderer
+
+    @renderer.setter
+    def renderer(self, renderer: AsyncRenderer) -> None:
+        self._renderer = renderer
+
+    @property
+    def textdraw(self) -> ImageDraw:
+        """A reusable drawing context for measuring characters."""
+        if self._textdraw is None:
+            self._textdraw = Draw(createImage('RGB', (1, 1)))
+        return self._textdraw
+
     @staticmethod
-    def create_noise_curve(image: Image, color: ColorTuple) -> Image:
+    def create_noise_curve(image: Image, color: ColorTuple | int,
+                           rng: RandomSource | None = None) -> Image:
+        if rng is None:
+            rng = default_source
         w, h = image.size
-        x1 = secrets.randbelow(int(w / 5) + 1)
-        x2 = secrets.randbelow(w - int(w / 5) + 1) + int(w / 5)
-        y1 = secrets.randbelow(h - 2 * int(h / 5) + 1) + int(h / 5)
-        y2 = secrets.randbelow(h - y1 - int(h / 5) + 1) + y1
+        x1 = rng.randbelow(int(w / 5) + 1)
+        x2 = rng.randbelow(w - int(w / 5) + 1) + int(w / 5)
+        y1 = rng.randbelow(h - 2 * int(h / 5) + 1) + int(h / 5)
+        y2 = rng.randbelow(h - y1 - int(h / 5) + 1) + y1
         points = [x1, y1, x2, y2]
-        end = secrets.randbelow(41) + 160
-        start = secrets.randbelow(21)
+        end = rng.randbelow(41) + 160
+        start = rng.randbelow(21)
         Draw(image).arc(points, start, end, fill=color)
         return image
 
     @staticmethod
     def create_noise_dots(
             image: Image,
-            color: ColorTuple,
+            color: ColorTuple | int,
             width: int = 3,
-            number: int = 30) -> Image:
+            number: int = 30,
+            rng: RandomSource | None = None) -> Image:
+        if rng is None:
+            rng = default_source
         draw = Draw(image)
         w, h = image.size
         while number:
-            x1 = secrets.randbelow(w + 1)
-            y1 = secrets.randbelow(h + 1)
+            x1 = rng.randbelow(w + 1)
+            y1 = rng.randbelow(h + 1)
             draw.line(((x1, y1), (x1 - 1, y1 - 1)), fill=color, width=width)
             number -= 1
         return image
@@ -110,29 +493,69 @@ class ImageCaptcha:
             c: str,
             draw: ImageDraw,
             color: ColorTuple) -> Image:
-        font = secrets.choice(self.truefonts)
-        _, _, w, h = draw.multiline_textbbox((1, 1), c, font=font)
-
-        dx1 = secrets.randbelow(self.character_offset_dx[1] - self.character_offset_dx[0] + 1) + self.character_offset_dx[0]
-        dy1 = secrets.randbelow(self.character_offset_dy[1] - self.character_offset_dy[0] + 1) + self.character_offset_dy[0]
-        im = createImage('RGBA', (int(w) + dx1, int(h) + dy1))
-        Draw(im).text((dx1, dy1), c, font=font, fill=color)
-
-        # rotate
-        im = im.crop(im.getbbox())
-        im = im.rotate(
-            self.character_rotate[0] + (secrets.randbits(32) / (2**32)) * (self.character_rotate[1] - self.character_rotate[0]),
-            Resampling.BILINEAR,
-            expand=True,
-        )
+        rng = self._rng
+        with stage(self.observer, 'image.glyph'):
+            font = rng.choice(self.truefonts)
+            if self.glyph_cache_size:
+                # the offset is cropped away with the empty border, a cached
+                # glyph is already cropped
+                glyph = self.glyphs.get(c, font, draw)
+                w, h = glyph.width, glyph.height
+                im = GlyphCache.colorize(glyph, color)
+            else:
+                _, _, w, h = draw.multiline_textbbox((1, 1), c, font=font)
+
+                dx1 = rng.randbelow(self.character_offset_dx[1] - self.character_offset_dx[0] + 1) + self.character_offset_dx[0]
+                dy1 = rng.randbelow(self.character_offset_dy[1] - self.character_offset_dy[0] + 1) + self.character_offset_dy[0]
+                im = createImage('RGBA', (int(w) + dx1, int(h) + dy1))
+                Draw(im).text((dx1, dy1), c, font=font, fill=color)
+                im = im.crop(im.getbbox())
+
+        with stage(self.observer, 'image.warp'):
+            # rotate
+            im = im.rotate(
+                self._rotate_angle(),
+                Resampling.BILINEAR,
+                expand=True,
+            )
+
+            # warp
+            w2, h2, data = self._warp_data(w, h)
+            im = im.resize((w2, h2))
+            im = im.transform((int(w), int(h)), Transform.QUAD, data)
+        return im
 
-        # warp
-        dx2 = w * (secrets.randbits(32) / (2**32)) * (self.character_warp_dx[1] - self.character_warp_dx[0]) + self.character_warp_dx[0]
-        dy2 = h * (secrets.randbits(32) / (2**32)) * (self.character_warp_dy[1] - self.character_warp_dy[0]) + self.character_warp_dy[0]
-        x1 = int(secrets.randbits(32) / (2**32) * (dx2 - (-dx2)) + (-dx2))
-        y1 = int(secrets.randbits(32) / (2**32) * (dy2 - (-dy2)) + (-dy2))
-        x2 = int(secrets.randbits(32) / (2**32) * (dx2 - (-dx2)) + (-dx2))
-        y2 = int(secrets.randbits(32) / (2**32) * (dy2 - (-dy2)) + (-dy2))
+    def _draw_fused_character(
+            self,
+            c: str,
+            draw: ImageDraw,
+            level: int) -> Image:
+        # the paste mask of the character, in a single transform
+        with stage(self.observer, 'image.glyph'):
+            font = self._rng.choice(self.truefonts)
+            if self.glyph_cache_size:
+                glyph = self.glyphs.get(c, font, draw)
+            else:
+                glyph = GlyphCache.render(c, font, draw)
+            w, h = glyph.width, glyph.height
+            mask = GlyphCache.level(glyph, level)
+        with stage(self.observer, 'image.warp'):
+            angle = self._rotate_angle()
+            w2, h2, data = self._warp_data(w, h)
+            quad = _compose_quad(mask.size, angle, (w2, h2), data)
+            return mask.transform((int(w), int(h)), Transform.QUAD, quad, Resampling.BILINEAR)
+
+    def _rotate_angle(self) -> float:
+        return self.character_rotate[0] + self._rng.random() * (self.character_rotate[1] - self.character_rotate[0])
+
+    def _warp_data(self, w: float, h: float) -> tuple[t.Any, t.Any, tuple[t.Any, ...]]:
+        rng = self._rng
+        dx2 = w * rng.random() * (self.character_warp_dx[1] - self.character_warp_dx[0]) + self.character_warp_dx[0]
+        dy2 = h * rng.random() * (self.character_warp_dy[1] - self.character_warp_dy[0]) + self.character_warp_dy[0]
+        x1 = int(rng.random() * (dx2 - (-dx2)) + (-dx2))
+        y1 = int(rng.random() * (dy2 - (-dy2)) + (-dy2))
+        x2 = int(rng.random() * (dx2 - (-dx2)) + (-dx2))
+        y2 = int(rng.random() * (dy2 - (-dy2)) + (-dy2))
         w2 = w + abs(x1) + abs(x2)
         h2 = h + abs(y1) + abs(y2)
         data = (
@@ -141,9 +564,7 @@ class ImageCaptcha:
             w2 + x2, h2 + y2,
             w2 - x2, -y1,
         )
-        im = im.resize((w2, h2))
-        im = im.transform((int(w), int(h)), Transform.QUAD, data)
-        return im
+        return w2, h2, data
 
     def create_captcha_image(
             self,
@@ -158,32 +579,73 @@ class ImageCaptcha:
 
         The color should be a tuple of 3 numbers, such as (0, 255, 255).
         """
-        image = createImage('RGB', (self._width, self._height), background)
-        draw = Draw(image)
+        draw = self.textdraw
+        rng = self._rng
 
         images: list[Image] = []
-        for c in chars:
-            if secrets.randbits(32) / (2**32) > self.word_space_probability:
-                images.append(self._draw_character(" ", draw, color))
-            images.append(self._draw_character(c, draw, color))
-
-        text_width = sum([im.size[0] for im in images])
-
-        width = max(text_width, self._width)
-        image = image.resize((width, self._height))
-
-        average = int(text_width / len(chars))
-        rand = int(self.word_offset_dx * average)
-        offset = int(average * 0.1)
-
-        for im in images:
-            w, h = im.size
-            mask = im.convert('L').point(self.lookup_table)
-            image.paste(im, (offset, int((self._height - h) / 2)), mask)
-            offset = offset + w + (-secrets.randbelow(rand + 1))
-
-        if width > self._width:
-            image = image.resize((self._width, self._height))
+        if self.fused_warp:
+            # the characters are paste masks of the solid color
+            level = min(self.lookup_table[_luminance(color)], 255)
+            for c in chars:
+                if rng.random() > self.word_space_probability:
+                    images.append(self._draw_fused_character(" ", draw, level))
+                images.append(self._draw_fused_character(c, draw, level))
+        else:
+            for c in chars:
+                if rng.random() > self.word_space_probability:
+                    images.append(self._draw_character(" ", draw, color))
+                images.append(self._draw_character(c, draw, color))
+
+        with stage(self.observer, 'image.composite'):
+            text_width = sum([im.size[0] for im in images])
+
+            average = int(text_width / len(chars))
+            rand = int(self.word_offset_dx * average)
+            offset = int(average * 0.1)
+
+            # layout the characters before drawing anything
+            offsets: list[int] = []
+            for im in images:
+                offsets.append(offset)
+                offset = offset + im.size[0] + (-rng.randbelow(rand + 1))
+
+            # overflowed text is squeezed to fit, one character at a time
+            scale = min(self._width / text_width, 1.0)
+
+            size = (self._width, self._height)
+            if self.arena is None:
+                image = createImage('RGB', size, background)
+            else:
+                image = self.arena.acquire_image('RGB', size, background)
+            if self.batch_composite:
+                # the characters are placed on one mask layer, which is
+                # blended into the image by a single paste
+                layer = createImage('L', size)
+            for im, offset in zip(images, offsets):
+                w, h = im.size
+                if scale < 1:
+                    w = max(int(w * scale), 1)
+                    im = im.resize((w, h))
+                    offset = int(offset * scale)
+                pos = (offset, int((self._height - h) / 2))
+                box = pos + (pos[0] + w, pos[1] + h)
+                if self.batch_composite:
+                    # a solid paste through every mask is a "screen" of them,
+                    # the same as pasting the color one mask after another
+                    layer.paste(255, box, im)
+                elif self.fused_warp:
+                    image.paste(color[:3], box, im)
+                else:
+                    mask = im.convert('L').point(self.lookup_table)
+                    image.paste(im, pos, mask)
+
+            if self.batch_composite:
+                if not self.fused_warp:
+                    # the classic mask is the level of the color wherever a
+                    # character is drawn, even faintly
+                    level = min(self.lookup_table[_luminance(color)], 255)
+                    layer = layer.point([0] + [level] * 255)
+                image.paste(color[:3], (0, 0) + size, layer)
 
         return image
 
@@ -196,54 +658,137 @@ class ImageCaptcha:
         :param bg_color: background color of the image in rgb format (r, g, b).
         :param fg_color: foreground color of the text in rgba format (r,g,b,a).
         """
-        background = bg_color if bg_color else random_color(238, 255)
-        random_fg_color = random_color(10, 200, secrets.randbelow(36) + 220)
+        rng = self._rng
+        background = bg_color if bg_color else random_color(238, 255, rng=rng)
+        random_fg_color = random_color(10, 200, rng.randbelow(36) + 220, rng=rng)
         color: ColorTuple = fg_color if fg_color else random_fg_color
 
         im = self.create_captcha_image(chars, color, background)
-        self.create_noise_dots(im, color)
-        self.create_noise_curve(im, color)
-        im = im.filter(SMOOTH)
-        return im
+        with stage(self.observer, 'image.noise'):
+            if self.noise_variants:
+                self.noise_atlas.draw_dots(im, color, rng)
+                self.noise_atlas.draw_curve(im, color, rng)
+            else:
+                self.create_noise_dots(im, color, rng=rng)
+                self.create_noise_curve(im, color, rng=rng)
+        with stage(self.observer, 'image.smooth'):
+            smooth = im.filter(SMOOTH)
+        if self.arena is not None:
+            # the canvas is never seen by the caller
+            self.arena.release_image(im)
+        return smooth
+
+    @t.overload
+    def generate(self, chars: str, format: str = ...,
+                 bg_color: ColorTuple | None = ...,
+                 fg_color: ColorTuple | None = ...,
+                 profile: str | OutputProfile | None = ...,
+                 out: None = ...) -> BytesIO: ...
+
+    @t.overload
+    def generate(self, chars: str, format: str = ...,
+                 bg_color: ColorTuple | None = ...,
+                 fg_color: ColorTuple | None = ...,
+                 profile: str | OutputProfile | None = ...,
+                 *, out: IO) -> IO: ...
 
     def generate(self, chars: str, format: str = 'png',
                  bg_color: ColorTuple | None = None,
-                 fg_color: ColorTuple | None = None) -> BytesIO:
+                 fg_color: ColorTuple | None = None,
+                 profile: str | OutputProfile | None = None,
+                 out: t.IO[bytes] | None = None) -> t.IO[bytes]:
         """Generate an Image Captcha of the given characters.
 
         :param chars: text to be generated.
         :param format: image file format
         :param bg_color: background color of the image in rgb format (r, g, b).
         :param fg_color: foreground color of the text in rgba format (r,g,b,a).
+        :param profile: name of a profile in :data:`PROFILES`, or an
+                        :class:`OutputProfile`, which overrides ``format``.
+        :param out: a writable binary file to write the image into, at its
+                    current position, it is returned as is.
         """
         im = self.generate_image(chars, bg_color=bg_color, fg_color=fg_color)
-        out = BytesIO()
-        im.save(out, format=format)
-        out.seek(0)
-        return out
+        encoder = _get_profile(format, profile)
+        buf = BytesIO() if out is None else out
+        with stage(self.observer, 'image.encode'):
+            encoder.save(im, buf)
+        if out is None:
+            buf.seek(0)
+        return buf
+
+    async def agenerate(self, chars: str, format: str = 'png',
+                        bg_color: ColorTuple | None = None,
+                        fg_color: ColorTuple | None = None,
+                        profile: str | OutputProfile | None = None) -> BytesIO:
+        """Generate an Image Captcha without blocking the event loop.
+
+        The image is generated by :attr:`renderer` in its executor, the
+        parameters are the same as :meth:`generate`.
+        """
+        return await self.renderer.run(
+            self.generate, chars, format,
+            bg_color=bg_color, fg_color=fg_color, profile=profile,
+        )
+
+    def generate_many(self, iterable: t.Iterable[str], format: str = 'png',
+                      bg_color: ColorTuple | None = None,
+                      fg_color: ColorTuple | None = None,
+                      profile: str | OutputProfile | None = None,
+                      ) -> t.Iterator[tuple[str, bytes]]:
+        """Generate Image Captchas for each of the given strings lazily::
+
+            for chars, data in captcha.generate_many(codes):
+                save(chars, data)
 
-    def write(self, chars: str, output: str, format: str = 'png',
+        The fonts, cached glyphs and output buffer are shared by the whole
+        batch, which is faster than calling :meth:`generate` in a loop.
+
+        :param iterable: texts to be generated.
+        :param format: image file format
+        :param bg_color: background color of the image in rgb format (r, g, b).
+        :param fg_color: foreground color of the text in rgba format (r,g,b,a).
+        :param profile: the encoder profile, see :meth:`generate`.
+        """
+        encoder = _get_profile(format, profile)
+        out = BytesIO()
+        for chars in iterable:
+            im = self.generate_image(chars, bg_color=bg_color, fg_color=fg_color)
+            out.seek(0)
+            out.truncate()
+            with stage(self.observer, 'image.encode'):
+                encoder.save(im, out)
+            yield chars, out.getvalue()
+
+    def write(self, chars: str, output: str | t.IO[bytes], format: str = 'png',
               bg_color: ColorTuple | None = None,
-              fg_color: ColorTuple | None = None) -> None:
+              fg_color: ColorTuple | None = None,
+              profile: str | OutputProfile | None = None) -> None:
         """Generate and write an image CAPTCHA data to the output.
 
         :param chars: text to be generated.
-        :param output: output destination.
+        :param output: output destination, a file path or a file object,
+                       e.g. of :meth:`DiskCache.open <captcha.diskcache.DiskCache.open>`.
         :param format: image file format
         :param bg_color: background color of the image in rgb format (r, g, b).
         :param fg_color: foreground color of the text in rgba format (r,g,b,a).
+        :param profile: the encoder profile, see :meth:`generate`.
         """
         im = self.generate_image(chars, bg_color=bg_color, fg_color=fg_color)
-        im.save(output, format=format)
+        with stage(self.observer, 'image.encode'):
+            _get_profile(format, profile).save(im, output)
 
 
 def random_color(
         start: int,
         end: int,
-        opacity: int | None = None) -> ColorTuple:
-    red = secrets.randbelow(end - start + 1) + start
-    green = secrets.randbelow(end - start + 1) + start
-    blue = secrets.randbelow(end - start + 1) + start
+        opacity: int | None = None,
+        rng: RandomSource | None = None) -> ColorTuple:
+    if rng is None:
+        rng = default_source
+    red = rng.randbelow(end - start + 1) + start
+    green = rng.randbelow(end - start + 1) + start
+    blue = rng.randbelow(end - start + 1) + start
     if opacity is None:
         return red, green, blue
     return red, green, blue, opacity
@@ -0,0 +1,137 @@
+# coding: utf-8
+"""
+    captcha.instrument
+    ~~~~~~~~~~~~~~~~~~
+
+    Measure the stages of CAPTCHA generation. Pass an observer to a CAPTCHA,
+    it is called with the name and the seconds of every stage::
+
+        def observer(stage: str, seconds: float) -> None:
+            print(stage, seconds)
+
+        captcha = ImageCaptcha(observer=observer)
+
+    The stages of :class:`~captcha.image.ImageCaptcha` are ``image.glyph``
+    and ``image.warp`` of every character, ``image.composite``,
+    ``image.noise``, ``image.smooth`` and ``image.encode``. The stages of
+    :class:`~captcha.audio.AudioCaptcha` are ``audio.twist``,
+    ``audio.noise``, ``audio.mix`` and ``audio.header``.
+
+    Without an observer, nothing is measured.
+"""
+
+from __future__ import annotations
+import bisect
+import threading
+import time
+import typing as t
+from contextlib import nullcontext
+
+__all__ = ['Observer', 'StageStats', 'PrometheusObserver', 'stage']
+
+#: a callable of the stage name and its duration in seconds
+Observer = t.Callable[[str, float], None]
+
+_disabled = nullcontext()
+
+
+class _Stage:
+    __slots__ = ('observer', 'name', 'start')
+
+    def __init__(self, observer: Observer, name: str):
+        self.observer = observer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.observer(self.name, time.perf_counter() - self.start)
+
+
+def stage(observer: Observer | None, name: str) -> t.ContextManager[None]:
+    """Measure the ``with`` block as the named stage, report it to the
+    observer. It does nothing when the observer is ``None``.
+    """
+    if observer is None:
+        return _disabled
+    return _Stage(observer, name)
+
+
+class StageStats:
+    """An observer that keeps a histogram of every stage in memory::
+
+        stats = StageStats()
+        captcha = ImageCaptcha(observer=stats)
+        ...
+        print(stats.summary())
+
+    :param buckets: the upper bounds of the histogram buckets, in seconds.
+    """
+    def __init__(self, buckets: t.Sequence[float] = (
+            0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)):
+        self.buckets = sorted(buckets)
+        #: the number of calls of every stage
+        self.counts: dict[str, int] = {}
+        #: the total seconds of every stage
+        self.totals: dict[str, float] = {}
+        #: the number of calls in every bucket, the last one is unbounded
+        self.histograms: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [0] * (len(self.buckets) + 1)
+                self.counts[name] = 0
+                self.totals[name] = 0.0
+            histogram[index] += 1
+            self.counts[name] += 1
+            self.totals[name] += seconds
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """The count, total and mean seconds of every stage."""
+        with self._lock:
+            return {
+                name: {
+                    'count': count,
+                    'total': self.totals[name],
+                    'mean': self.totals[name] / count,
+                }
+                for name, count in self.counts.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counts.clear()
+            self.totals.clear()
+            self.histograms.clear()
+
+
+class PrometheusObserver:
+    """An observer that records the stages into a Prometheus histogram,
+    labeled by stage. It requires ``prometheus-client``.
+
+    :param name: the name of the histogram.
+    :param registry: the registry of the histogram, default to the global one.
+    :param buckets: the upper bounds of the histogram buckets, in seconds.
+    """
+    def __init__(self, name: str = 'captcha_stage_seconds',
+                 registry: t.Any = None,
+                 buckets: t.Sequence[float] | None = None):
+        from prometheus_client import REGISTRY, Histogram
+
+        kwargs: dict[str, t.Any] = {}
+        if buckets is not None:
+            kwargs['buckets'] = buckets
+        self.histogram = Histogram(
+            name, 'Seconds of the CAPTCHA generation stages.', ['stage'],
+            registry=REGISTRY if registry is None else registry,
+            **kwargs,
+        )
+
+    def __call__(self, name: str, seconds: float) -> None:
+        self.histogram.labels(name).observe(seconds)
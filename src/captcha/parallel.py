@@ -0,0 +1,148 @@
+# coding: utf-8
+"""
+    captcha.parallel
+    ~~~~~~~~~~~~~~~~
+
+    Generate CAPTCHAs in a pool of processes, to use every CPU core.
+"""
+
+from __future__ import annotations
+import os
+import typing as t
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing.context import BaseContext
+from .image import ImageCaptcha
+
+if t.TYPE_CHECKING:
+    from .audio import AudioCaptcha
+
+__all__ = ['ParallelCaptcha']
+
+Captcha = t.Union[ImageCaptcha, 'AudioCaptcha']
+CaptchaFactory = t.Callable[[], Captcha]
+
+# the CAPTCHA instance of a worker process
+_captcha: Captcha | None = None
+
+
+def _initialize(factory: CaptchaFactory) -> None:
+    global _captcha
+    captcha = factory()
+    if isinstance(captcha, ImageCaptcha):
+        # load fonts
+        captcha.truefonts
+    else:
+        captcha.load()
+    _captcha = captcha
+
+
+def _render(chars: str, options: dict[str, t.Any]) -> bytes:
+    if _captcha is None:  # pragma: no cover
+        raise RuntimeError('worker is not initialized')
+    if isinstance(_captcha, ImageCaptcha):
+        out = BytesIO()
+        _captcha.generate(chars, out=out, **options)
+        return out.getvalue()
+    return bytes(_captcha.generate(chars))
+
+
+def _render_many(chunk: list[str], options: dict[str, t.Any]) -> list[bytes]:
+    return [_render(chars, options) for chars in chunk]
+
+
+class ParallelCaptcha:
+    """Generate CAPTCHAs in worker processes.
+
+    Every worker builds its own CAPTCHA instance with the given factory once,
+    so that fonts and voices are loaded only at start up. The results are
+    sent back as bytes::
+
+        from functools import partial
+        from captcha.image import ImageCaptcha
+        from captcha.parallel import ParallelCaptcha
+
+        with ParallelCaptcha(partial(ImageCaptcha, width=200)) as pool:
+            data = pool.generate('1234')
+            future = pool.submit('5678', format='jpeg')
+
+    The factory is sent to the workers, it must be picklable, e.g. a class or
+    a :func:`functools.partial` of it.
+
+    :param factory: a callable that creates an ImageCaptcha or AudioCaptcha.
+    :param max_workers: the number of worker processes, default to CPU count.
+    :param mp_context: the multiprocessing context to start workers with.
+    """
+    def __init__(self, factory: CaptchaFactory = ImageCaptcha,
+                 max_workers: int | None = None,
+                 mp_context: BaseContext | None = None):
+        self.factory = factory
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=mp_context,
+            initializer=_initialize,
+            initargs=(factory,),
+        )
+
+    def __enter__(self) -> ParallelCaptcha:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.shutdown()
+
+    def submit(self, chars: str, **options: t.Any) -> Future[bytes]:
+        """Schedule a CAPTCHA to be generated, return a future of its data.
+
+        :param chars: text to be generated.
+        :param options: extra parameters of ``ImageCaptcha.generate``.
+        """
+        return self._executor.submit(_render, chars, options)
+
+    def generate(self, chars: str, **options: t.Any) -> bytes:
+        """Generate a CAPTCHA in a worker process and wait for its data.
+
+        :param chars: text to be generated.
+        :param options: extra parameters of ``ImageCaptcha.generate``.
+        """
+        return self.submit(chars, **options).result()
+
+    def generate_many(self, iterable: t.Iterable[str], chunksize: int = 16,
+                      **options: t.Any) -> t.Iterator[tuple[str, bytes]]:
+        """Generate CAPTCHAs for each of the given strings across workers.
+
+        The strings are sent to the workers in chunks, and the results are
+        yielded in order as ``(chars, data)`` pairs.
+
+        :param iterable: texts to be generated.
+        :param chunksize: the number of CAPTCHAs a worker renders per task.
+        :param options: extra parameters of ``ImageCaptcha.generate``.
+        """
+        chunks = _chunked(iterable, chunksize)
+        futures: list[tuple[list[str], Future[list[bytes]]]] = []
+        # keep every worker busy, without queueing the whole iterable
+        pending = self.max_workers * 2
+        for chunk in chunks:
+            futures.append((chunk, self._executor.submit(_render_many, chunk, options)))
+            if len(futures) < pending:
+                continue
+            chunk, future = futures.pop(0)
+            yield from zip(chunk, future.result())
+
+        for chunk, future in futures:
+            yield from zip(chunk, future.result())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait)
+
+
+def _chunked(iterable: t.Iterable[str], size: int) -> t.Iterator[list[str]]:
+    chunk: list[str] = []
+    for chars in iterable:
+        chunk.append(chars)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,237 @@
+# coding: utf-8
+"""
+    captcha.pool
+    ~~~~~~~~~~~~
+
+    Keep pre-rendered CAPTCHAs in memory, refilled in the background.
+"""
+
+from __future__ import annotations
+import logging
+import string
+import sys
+import threading
+import time
+import typing as t
+from collections import deque
+from .image import ImageCaptcha
+from .rng import RandomSource, default_source
+
+if t.TYPE_CHECKING:
+    from .audio import AudioCaptcha
+    from .parallel import ParallelCaptcha
+
+__all__ = ['CaptchaPool']
+
+ALPHABET = string.digits + string.ascii_uppercase
+
+logger = logging.getLogger(__name__)
+
+
+def _audio_captcha(captcha: t.Any) -> AudioCaptcha | None:
+    # an AudioCaptcha exists only once captcha.audio is imported, a pool of
+    # images does not import the audio module
+    module = sys.modules.get('captcha.audio')
+    if module is not None and isinstance(captcha, module.AudioCaptcha):
+        return t.cast('AudioCaptcha', captcha)
+    return None
+
+
+class _Entry(t.NamedTuple):
+    answer: str
+    payload: bytes
+    expires: float
+
+
+class CaptchaPool:
+    """A pool of ready ``(answer, payload)`` pairs.
+
+    Serving a CAPTCHA from the pool is a pop instead of a render. Background
+    threads refill the pool up to ``size`` once it drops below ``low_water``,
+    and entries older than ``ttl`` seconds are dropped, they are never served
+    twice::
+
+        pool = CaptchaPool(ImageCaptcha(), size=1000, ttl=300)
+        pool.start()
+
+        answer, data = pool.pop()
+
+    Wrap a :class:`captcha.parallel.ParallelCaptcha` to refill the pool with
+    worker processes, use as many threads as the processes to keep them busy.
+
+    :param captcha: an ImageCaptcha, AudioCaptcha or ParallelCaptcha.
+    :param size: the number of entries to keep.
+    :param low_water: refill the pool when it holds fewer entries than this,
+                      default to half of the size.
+    :param ttl: seconds an entry can be served after it was rendered.
+    :param workers: the number of refilling threads.
+    :param length: the length of the generated answers.
+    :param answer: a callable that generates answers, instead of ``length``.
+    :param options: extra parameters of ``ImageCaptcha.generate``.
+
+    A refilling thread that fails to render a CAPTCHA logs the error, and
+    tries again after ``retry_delay`` seconds.
+    """
+    retry_delay: float = 1.0
+
+    def __init__(
+            self,
+            captcha: ImageCaptcha | AudioCaptcha | ParallelCaptcha,
+            size: int = 100,
+            low_water: int | None = None,
+            ttl: float = 300,
+            workers: int = 1,
+            length: int = 4,
+            answer: t.Callable[[], str] | None = None,
+            **options: t.Any):
+        self.captcha = captcha
+        self.size = size
+        self.low_water = size // 2 if low_water is None else low_water
+        self.ttl = ttl
+        self.workers = workers
+        self.length = length
+        self.options = options
+        self._answer = answer
+
+        #: number of pops served from the pool
+        self.hits = 0
+        #: number of pops rendered on demand
+        self.misses = 0
+        #: number of entries dropped after their ttl
+        self.expired = 0
+        #: payload bytes held by the pool
+        self.nbytes = 0
+        #: seconds the last refill took to fill the pool up
+        self.refill_lag = 0.0
+        #: number of renders of the refilling threads that failed
+        self.errors = 0
+
+        self._entries: deque[_Entry] = deque()
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._running = False
+        self._refill_since: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> CaptchaPool:
+        self.start()
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def random(self) -> str:
+        """Generate a random answer."""
+        if self._answer is not None:
+            return self._answer()
+        audio = _audio_captcha(self.captcha)
+        if audio is not None:
+            return ''.join(audio.random(self.length))
+        # the random source of the captcha, e.g. seeded for reproducible pools
+        rng: RandomSource = getattr(self.captcha, '_rng', default_source)
+        return ''.join(rng.choice(ALPHABET) for _ in range(self.length))
+
+    def render(self) -> tuple[str, bytes]:
+        """Render a new ``(answer, payload)`` pair."""
+        answer = self.random()
+        captcha = self.captcha
+        audio = _audio_captcha(captcha)
+        if isinstance(captcha, ImageCaptcha):
+            payload = captcha.generate(answer, **self.options).getvalue()
+        elif audio is not None:
+            payload = bytes(audio.generate(answer))
+        else:
+            payload = captcha.generate(answer, **self.options)
+        return answer, payload
+
+    def start(self) -> None:
+        """Start the refilling threads."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._refill, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self) -> None:
+        """Stop the refilling threads and drop all entries."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._cond:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def pop(self) -> tuple[str, bytes]:
+        """Take a ready ``(answer, payload)`` pair out of the pool. If the
+        pool is empty, the CAPTCHA is rendered on demand.
+        """
+        with self._cond:
+            self._evict(time.monotonic())
+            if self._entries:
+                entry = self._entries.popleft()
+                self.nbytes -= len(entry.payload)
+                self.hits += 1
+                if len(self._entries) < self.low_water:
+                    self._cond.notify()
+                return entry.answer, entry.payload
+            self.misses += 1
+            self._cond.notify()
+        return self.render()
+
+    def _evict(self, now: float) -> None:
+        # entries are appended in the order of their expiry
+        while self._entries and self._entries[0].expires <= now:
+            entry = self._entries.popleft()
+            self.nbytes -= len(entry.payload)
+            self.expired += 1
+
+    def _refill(self) -> None:
+        filling = False
+        while True:
+            with self._cond:
+                while self._running:
+                    self._evict(time.monotonic())
+                    count = len(self._entries)
+                    if count >= self.size:
+                        if filling and self._refill_since is not None:
+                            self.refill_lag = time.monotonic() - self._refill_since
+                            self._refill_since = None
+                        filling = False
+                    elif filling or count < self.low_water:
+                        if self._refill_since is None:
+                            self._refill_since = time.monotonic()
+                        filling = True
+                        break
+                    # wake up to drop the expired entries
+                    timeout = self._entries[0].expires - time.monotonic() if self._entries else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+
+            try:
+                answer, payload = self.render()
+            except Exception:
+                logger.exception('Failed to render a CAPTCHA of the pool')
+                with self._cond:
+                    self.errors += 1
+                    # close() wakes the thread up
+                    self._cond.wait(self.retry_delay)
+                continue
+            with self._cond:
+                if len(self._entries) < self.size:
+                    expires = time.monotonic() + self.ttl
+                    self._entries.append(_Entry(answer, payload, expires))
+                    self.nbytes += len(payload)
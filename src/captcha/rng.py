@@ -0,0 +1,171 @@
+# coding: utf-8
+"""
+    captcha.rng
+    ~~~~~~~~~~~
+
+    Sources of randomness for image and audio CAPTCHAs.
+
+    Both :class:`~captcha.image.ImageCaptcha` and
+    :class:`~captcha.audio.AudioCaptcha` draw many random numbers for every
+    CAPTCHA. By default they share a :class:`BufferedRandomSource`, which
+    reads the operating system CSPRNG in large blocks instead of once per
+    number.
+"""
+
+from __future__ import annotations
+import os
+import random as _random
+import threading
+import typing as t
+import weakref
+
+__all__ = [
+    'RandomSource',
+    'SystemRandomSource',
+    'BufferedRandomSource',
+    'SeededRandomSource',
+    'default_source',
+]
+
+T = t.TypeVar('T')
+
+
+class RandomSource:
+    """The base class of random sources, subclasses implement
+    :meth:`randbytes`, every other number is drawn from its bytes.
+    """
+    def randbytes(self, n: int) -> bytes:
+        """Return ``n`` random bytes."""
+        raise NotImplementedError()
+
+    def randbits(self, k: int) -> int:
+        """Return a non-negative int with ``k`` random bits."""
+        if k <= 0:
+            return 0
+        size = (k + 7) // 8
+        value = int.from_bytes(self.randbytes(size), 'little')
+        return value >> (size * 8 - k)
+
+    def randbelow(self, n: int) -> int:
+        """Return a random int in the range ``[0, n)``."""
+        if n <= 0:
+            raise ValueError('Upper bound must be positive.')
+        k = n.bit_length()
+        # rejection sampling keeps the distribution uniform
+        value = self.randbits(k)
+        while value >= n:
+            value = self.randbits(k)
+        return value
+
+    def choice(self, seq: t.Sequence[T]) -> T:
+        """Return a random element from the non-empty sequence."""
+        return seq[self.randbelow(len(seq))]
+
+    def random(self) -> float:
+        """Return a random float in the range ``[0.0, 1.0)``."""
+        return self.randbits(53) / 9007199254740992.0
+
+
+class SystemRandomSource(RandomSource):
+    """Read every number from ``os.urandom``, the same as :mod:`secrets`."""
+    def randbytes(self, n: int) -> bytes:
+        return os.urandom(n)
+
+
+class BufferedRandomSource(RandomSource):
+    """Serve random numbers from blocks of ``os.urandom``.
+
+    Every thread reads its own block, and the blocks are discarded in a
+    forked child process, so that threads or processes never share random
+    numbers. Bulk bytes, e.g. for audio noise, are read from ``os.urandom``
+    directly.
+
+    :param block_size: the number of bytes read from the OS at a time.
+    """
+    def __init__(self, block_size: int = 4096):
+        self.block_size = max(block_size - block_size % 4, 4)
+        self._local = threading.local()
+        _buffered_sources.add(self)
+
+    def _reset(self) -> None:
+        self._local = threading.local()
+
+    def _words(self) -> t.Iterator[int]:
+        # the random 32 bits ints of the current thread
+        try:
+            return t.cast(t.Iterator[int], self._local.words)
+        except AttributeError:
+            return self._refill()
+
+    def _refill(self) -> t.Iterator[int]:
+        words = iter(memoryview(os.urandom(self.block_size)).cast('I'))
+        self._local.words = words
+        return words
+
+    def randbytes(self, n: int) -> bytes:
+        return os.urandom(n)
+
+    def randbits(self, k: int) -> int:
+        if 0 < k <= 32:
+            try:
+                return next(self._words()) >> (32 - k)
+            except StopIteration:
+                return next(self._refill()) >> (32 - k)
+        return super().randbits(k)
+
+    def randbelow(self, n: int) -> int:
+        if n <= 0:
+            raise ValueError('Upper bound must be positive.')
+        k = n.bit_length()
+        if k > 32:
+            return super().randbelow(n)
+        shift = 32 - k
+        words = self._words()
+        try:
+            value = next(words) >> shift
+            while value >= n:
+                value = next(words) >> shift
+        except StopIteration:
+            self._refill()
+            return self.randbelow(n)
+        return value
+
+    def random(self) -> float:
+        words = self._words()
+        try:
+            a = next(words) >> 5
+            b = next(words) >> 6
+        except StopIteration:
+            self._refill()
+            return self.random()
+        return (a * 67108864.0 + b) / 9007199254740992.0
+
+
+_buffered_sources: weakref.WeakSet[BufferedRandomSource] = weakref.WeakSet()
+
+
+def _reset_buffered_sources() -> None:
+    for source in list(_buffered_sources):
+        source._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_buffered_sources)
+
+
+class SeededRandomSource(RandomSource):
+    """A deterministic source for tests, **never** use it in production.
+
+    :param seed: the seed of :class:`random.Random`.
+    """
+    def __init__(self, seed: int | str | bytes | None = None):
+        self._random = _random.Random(seed)
+
+    def randbytes(self, n: int) -> bytes:
+        if n <= 0:
+            return b''
+        return self._random.getrandbits(n * 8).to_bytes(n, 'little')
+
+
+#: the source shared by the CAPTCHAs created without one
+default_source: RandomSource = BufferedRandomSource()
@@ -0,0 +1,176 @@
+# coding: utf-8
+"""
+    captcha.voicepack
+    ~~~~~~~~~~~~~~~~~
+
+    A voice library packed into one file, which is mapped into memory
+    instead of being read. Build a pack from a voice directory with::
+
+        python -m captcha.voicepack build /path/to/voices voices.pack
+
+    Then use the pack file as the ``voicedir`` of
+    :class:`~captcha.audio.AudioCaptcha`.
+
+    The pack is a header, an index of ``(char, offset, length)`` records,
+    then the wave bodies of the voices. The index is read when the pack is
+    opened; the voices are views of the mapped file, which are paged in
+    on demand, and shared by every process that maps the same file.
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import mmap
+import os
+import struct
+import sys
+import typing as t
+import wave
+
+__all__ = ['VoicePack', 'build']
+
+MAGIC = b'CAPVOICE'
+VERSION = 1
+#: magic, version, sample width, frame rate, number of voices
+HEADER = struct.Struct('<8sHHII')
+#: code point of the char, offset and length of the wave body
+RECORD = struct.Struct('<IQI')
+
+
+class VoicePack:
+    """A read-only voice library packed by :func:`build`.
+
+    :param path: the path of the pack file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise ValueError(f'Not a voice pack: {path}')
+        magic, version, sampwidth, framerate, count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'Not a voice pack: {path}')
+        if version != VERSION:
+            self._mmap.close()
+            raise ValueError(f'Unsupported voice pack version: {version}')
+
+        self.sampwidth: int = sampwidth
+        self.framerate: int = framerate
+        view = memoryview(self._mmap)
+        self._voices: dict[str, list[memoryview]] = {}
+        for i in range(count):
+            code, offset, length = RECORD.unpack_from(self._mmap, HEADER.size + i * RECORD.size)
+            self._voices.setdefault(chr(code), []).append(view[offset:offset + length])
+
+    def __enter__(self) -> VoicePack:
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(map(len, self._voices.values()))
+
+    @property
+    def choices(self) -> list[str]:
+        """The characters in the pack."""
+        return list(self._voices)
+
+    def voices(self, name: str) -> list[memoryview]:
+        """The wave bodies of the character, as views of the pack."""
+        return self._voices[name]
+
+    def close(self) -> None:
+        """Unmap the pack. The voices loaded by an AudioCaptcha are views
+        of the pack, in which case the file stays mapped until the last of
+        them is gone."""
+        self._voices = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            # the views keep a reference of the mmap, which is unmapped
+            # when it is collected
+            pass
+
+
+def _find_voices(voicedir: str) -> t.Iterator[tuple[str, str]]:
+    # the same layout as AudioCaptcha: one directory per character
+    for name in sorted(os.listdir(voicedir)):
+        dirname = os.path.join(voicedir, name)
+        if len(name) != 1 or not os.path.isdir(dirname):
+            continue
+        for f in sorted(os.listdir(dirname)):
+            filepath = os.path.join(dirname, f)
+            if f.endswith('.wav') and os.path.isfile(filepath):
+                yield name, filepath
+
+
+def build(voicedir: str, output: str) -> int:
+    """Pack the voice directory into the output file, return the number
+    of voices. All the wave files must have the same format.
+
+    :param voicedir: the voice data library directory.
+    :param output: the path of the pack file.
+    """
+    files = list(_find_voices(voicedir))
+    params: tuple[int, int] | None = None
+    records: list[tuple[int, int, int]] = []
+    offset = HEADER.size + RECORD.size * len(files)
+
+    tmp = output + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.seek(offset)
+            for name, filepath in files:
+                with wave.open(filepath) as w:
+                    if params is None:
+                        params = (w.getsampwidth(), w.getframerate())
+                    elif params != (w.getsampwidth(), w.getframerate()):
+                        raise ValueError(f'Wave format of {filepath} differs from the others')
+                    body = w.readframes(-1)
+                f.write(body)
+                records.append((ord(name), offset, len(body)))
+                offset += len(body)
+
+            sampwidth, framerate = params or (1, 8000)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, sampwidth, framerate, len(records)))
+            for record in records:
+                f.write(RECORD.pack(*record))
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, output)
+    return len(records)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m captcha.voicepack')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='pack a voice directory')
+    build_parser.add_argument('voicedir')
+    build_parser.add_argument('output')
+    info_parser = commands.add_parser('info', help='show the voices of a pack')
+    info_parser.add_argument('pack')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build(args.voicedir, args.output)
+        print(f'{count} voices packed into {args.output}')
+        return 0
+
+    with VoicePack(args.pack) as pack:
+        print(f'{pack.sampwidth * 8}-bit {pack.framerate}Hz, {len(pack)} voices')
+        for name in pack.choices:
+            size = sum(map(len, pack.voices(name)))
+            print(f'{name}: {len(pack.voices(name))} voices, {size} bytes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
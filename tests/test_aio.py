@@ -0,0 +1,48 @@
+# coding: utf-8
+
+import asyncio
+import threading
+import pytest
+from captcha.aio import AsyncRenderer, RenderQueueFull
+from captcha.image import ImageCaptcha
+from captcha.audio import AudioCaptcha
+
+
+def test_image_agenerate():
+    captcha = ImageCaptcha()
+    data = asyncio.run(captcha.agenerate('1234'))
+    assert hasattr(data, 'read')
+    assert captcha.renderer.completed == 1
+    assert captcha.renderer.last is not None
+    assert captcha.renderer.last.render_time > 0
+
+
+def test_audio_agenerate():
+    metrics = []
+    captcha = AudioCaptcha()
+    captcha.renderer = AsyncRenderer(observer=metrics.append)
+
+    async def run():
+        return await asyncio.gather(*[captcha.agenerate('1234') for _ in range(3)])
+
+    rv = asyncio.run(run())
+    assert len(rv) == 3
+    assert len(metrics) == 3
+    assert captcha.renderer.pending == 0
+
+
+def test_renderer_back_pressure():
+    event = threading.Event()
+    renderer = AsyncRenderer(max_concurrency=1, max_pending=1)
+
+    async def run():
+        task = asyncio.ensure_future(renderer.run(event.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(RenderQueueFull):
+            await renderer.run(event.wait)
+        event.set()
+        await task
+
+    asyncio.run(run())
+    assert renderer.rejected == 1
+    assert renderer.completed == 1
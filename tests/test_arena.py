@@ -0,0 +1,47 @@
+# coding: utf-8
+
+import io
+from captcha.arena import BufferPool
+from captcha.audio import AudioCaptcha
+from captcha.image import ImageCaptcha
+from captcha.rng import SeededRandomSource
+
+
+def test_buffer_pool():
+    pool = BufferPool(max_bytes=16384, max_per_size=1)
+    buf = pool.acquire(5000)
+    assert len(buf) == 8192
+    pool.release(buf)
+    assert pool.acquire(6000) is buf
+    pool.release(buf)
+    pool.release(bytearray(8192))
+    pool.release(bytearray(100))
+    assert pool.stats() == {
+        'hits': 1, 'misses': 1, 'drops': 1, 'buffers': 1, 'nbytes': 8192,
+    }
+    pool.release(bytearray(16384))
+    assert pool.drops == 2
+    pool.clear()
+    assert len(pool) == 0 and pool.nbytes == 0
+
+
+def test_buffer_pool_image():
+    pool = BufferPool()
+    im = pool.acquire_image('RGB', (4, 2), (0, 0, 0))
+    pool.release_image(im)
+    assert pool.acquire_image('RGB', (4, 2), (1, 2, 3)) is im
+    assert im.getcolors() == [(8, (1, 2, 3))]
+
+
+def test_arena_same_output():
+    pool = BufferPool()
+    for arena in (None, pool, pool):
+        image = ImageCaptcha(rng=SeededRandomSource(1), arena=arena)
+        audio = AudioCaptcha(rng=SeededRandomSource(1), arena=arena)
+        out = io.BytesIO()
+        audio.write('1234', out)
+        data = (image.generate('1234').getvalue(), out.getvalue(), b''.join(audio.stream('12')))
+        if arena is None:
+            expected = data
+        assert data == expected
+    assert pool.hits >= 3
@@ -1,7 +1,16 @@
 # coding: utf-8
 
 import os
-from captcha.audio import AudioCaptcha
+import copy
+import io
+import secrets
+import subprocess
+import sys
+import wave
+import pytest
+from captcha import audio
+from captcha.audio import AudioCaptcha, VoiceBank
+from captcha.rng import SeededRandomSource
 
 ROOT = os.path.abspath(os.path.dirname(__file__))
 
@@ -24,3 +33,250 @@ def test_save_audio():
     filepath = os.path.join(ROOT, 'demo.wav')
     captcha.write('1234', filepath)
     assert os.path.isfile(filepath)
+
+
+def test_save_audio_path(tmp_path):
+    filepath = tmp_path / 'demo.wav'
+    AudioCaptcha().write('1234', filepath)
+    with wave.open(str(filepath)) as w:
+        assert w.getnframes() > 0
+
+
+def test_speedups_match_reference(monkeypatch):
+    _speedups = pytest.importorskip('captcha._speedups')
+    body = bytearray(secrets.token_bytes(3000))
+    other = bytearray(secrets.token_bytes(2000))
+
+    monkeypatch.setattr(audio, '_speedups', None)
+    for speed in (0.8, 0.93, 1.17, 1.4):
+        expected = audio.change_speed(body, speed)
+        assert _speedups.change_speed(body, speed) == expected
+        expected = audio.change_speed(body, speed, 'linear')
+        assert _speedups.change_speed_linear(body, speed) == expected
+    for level in (0.2, 0.85, 1.2):
+        expected = audio.change_sound(body, level)
+        assert _speedups.change_sound(body, level) == expected
+    expected = audio.mix_wave(copy.copy(other), copy.copy(body))
+    assert _speedups.mix_wave(copy.copy(other), copy.copy(body)) == expected
+    assert audio.create_silence(1600) == bytearray([128] * 1600)
+
+
+def test_speedups_noise():
+    _speedups = pytest.importorskip('captcha._speedups')
+    noise = _speedups.create_noise(8000, 4)
+    assert len(noise) == 8000
+    assert set(noise) <= {126, 127, 128, 129}
+
+
+def test_voice_bank():
+    bank = VoiceBank(max_bytes=1024 * 1024)
+    captcha = AudioCaptcha(bank=bank)
+    data = captcha.generate('1234')
+    assert bytearray(b'RIFF') in data
+    assert bank.misses > 0
+    assert 0 < bank.nbytes <= bank.max_bytes
+    assert len(bank) == bank.misses
+
+    picks = bank.hits + bank.misses
+    captcha.generate('1234')
+    assert bank.hits + bank.misses > picks
+
+
+def test_voice_bank_preload():
+    bank = VoiceBank(max_bytes=256 * 1024, preload=True)
+    captcha = AudioCaptcha(bank=bank)
+    captcha.load()
+    assert len(bank) > 0
+    assert bank.nbytes <= bank.max_bytes
+    assert bank.misses == 0
+
+
+def test_voice_bank_preload_coverage():
+    bank = VoiceBank(max_bytes=10 * 1024 * 1024, preload=True)
+    captcha = AudioCaptcha(bank=bank)
+    captcha.load()
+    voices = sum(map(len, captcha._cache.values()))
+    # every noise variant, then twisted voices of every character
+    noises = [key for key in bank._variants if key[-1]]
+    assert len(noises) == voices * len(audio.NOISE_SPEEDS) * len(audio.NOISE_LEVELS)
+    twisted = {key[3] for key in bank._variants if not key[-1]}
+    assert twisted == set(captcha.choices)
+    assert bank.nbytes <= bank.max_bytes
+
+
+@pytest.mark.skipif(audio._speedups is None, reason='requires numpy')
+def test_voice_bank_shared():
+    bank = VoiceBank()
+    AudioCaptcha(bank=bank, rng=SeededRandomSource(5)).generate('1234')
+    shared = AudioCaptcha(bank=bank, rng=SeededRandomSource(5),
+                          sample_format=audio.S16_16000)
+    alone = AudioCaptcha(bank=VoiceBank(), rng=SeededRandomSource(5),
+                         sample_format=audio.S16_16000)
+    assert shared.generate('1234') == alone.generate('1234')
+
+    shared = AudioCaptcha(bank=bank, rng=SeededRandomSource(5))
+    alone = AudioCaptcha(bank=VoiceBank(), rng=SeededRandomSource(5))
+    shared.resample = alone.resample = 'linear'
+    assert shared.generate('1234') == alone.generate('1234')
+
+
+def test_audio_generate_many():
+    captcha = AudioCaptcha()
+    codes = ['1234', '5678']
+    rv = list(captcha.generate_many(iter(codes)))
+    assert [chars for chars, _ in rv] == codes
+    for _, data in rv:
+        assert data.startswith(b'RIFF')
+
+
+def test_audio_stream():
+    captcha = AudioCaptcha()
+    chunks = list(captcha.stream('1234', chunk_size=1024))
+    assert all(len(chunk) <= 1024 for chunk in chunks)
+    data = b''.join(chunks)
+    assert data.startswith(b'RIFF')
+    assert len(data) % 2 == 0
+    assert len(data) == audio.struct.unpack('<I', data[4:8])[0] + 8
+
+
+def test_write_audio_file_object():
+    captcha = AudioCaptcha()
+    out = io.BytesIO()
+    captcha.write('1234', out)
+    data = out.getvalue()
+    assert data.startswith(b'RIFF')
+    assert len(data) == audio.struct.unpack('<I', data[4:8])[0] + 8
+
+
+def test_patch_wave_header():
+    for body in (bytearray(b'\x80' * 10), bytearray(b'\x80' * 11)):
+        data = audio.patch_wave_header(body)
+        assert data[-len(body) - len(body) % 2:][:len(body)] == body
+        assert len(data) % 2 == 0
+        assert audio.struct.unpack('<I', data[40:44])[0] == len(body)
+
+
+def test_mix_wave_into(monkeypatch):
+    src = bytearray(secrets.token_bytes(300))
+    dst = bytearray(secrets.token_bytes(1000))
+    expected = copy.copy(dst)
+    expected[900:] = audio.mix_wave(src[:100], expected[900:])
+
+    for engine in (audio._speedups, None):
+        monkeypatch.setattr(audio, '_speedups', engine)
+        rv = copy.copy(dst)
+        audio.mix_wave_into(rv, src, 900)
+        assert rv == expected
+
+
+def test_audio_warmup():
+    captcha = AudioCaptcha()
+    elapsed = captcha.warmup()
+    assert elapsed > 0
+    # the voices are shared by other instances
+    other = AudioCaptcha()
+    other.load()
+    assert other._cache is captcha._cache
+    other.load(reload=True)
+    assert other._cache is not captcha._cache
+    assert other.choices == captcha.choices
+
+
+def _change_speed_loop(body, speed):
+    # the classic sample by sample implementation
+    length = int(len(body) * speed)
+    rv = bytearray(length)
+    step = 0
+    for v in body:
+        i = int(step)
+        while i < int(step + speed) and i < length:
+            rv[i] = v
+            i += 1
+        step += speed
+    return rv
+
+
+def test_change_speed_nearest(monkeypatch):
+    monkeypatch.setattr(audio, '_speedups', None)
+    for size in (0, 1, 7, 3000):
+        body = bytearray(secrets.token_bytes(size))
+        for speed in audio.TWIST_SPEEDS + audio.NOISE_SPEEDS + [0.33, 2.7]:
+            assert audio.change_speed(body, speed) == _change_speed_loop(body, speed)
+
+
+def test_change_speed_linear(monkeypatch):
+    body = bytearray([0, 100, 200])
+    for engine in (audio._speedups, None):
+        monkeypatch.setattr(audio, '_speedups', engine)
+        assert audio.change_speed(body, 2, 'linear') == bytearray([0, 50, 100, 150, 200, 200])
+        with pytest.raises(ValueError):
+            audio.change_speed(body, 2, 'cubic')
+
+    captcha = AudioCaptcha()
+    captcha.resample = 'linear'
+    assert captcha.generate('1234').startswith(b'RIFF')
+
+
+@pytest.mark.skipif(audio._speedups is None, reason='requires numpy')
+def test_sample_formats():
+    for fmt in (audio.S16_16000, audio.S16_22050):
+        captcha = AudioCaptcha(sample_format=fmt)
+        data = captcha.generate('1234')
+        with wave.open(io.BytesIO(data)) as w:
+            assert w.getsampwidth() == 2
+            assert w.getframerate() == fmt.rate
+            assert w.getnframes() * 2 == len(data) - 44
+        assert b''.join(captcha.stream('1234', 4096)).startswith(b'RIFF')
+
+
+@pytest.mark.skipif(audio._speedups is None, reason='requires numpy')
+def test_sample_format_convert():
+    body = bytearray([0, 64, 128, 192, 255])
+    s16 = audio.S16_16000.convert(body, audio.U8_8000)
+    assert len(s16) == 20
+    assert audio.U8_8000.convert(s16, audio.S16_16000) == body
+    assert audio.S16_16000.convert(s16, audio.S16_16000) is s16
+
+
+def test_sample_format_requires_numpy(monkeypatch):
+    monkeypatch.setattr(audio, '_speedups', None)
+    with pytest.raises(RuntimeError):
+        AudioCaptcha(sample_format=audio.S16_16000)
+    with pytest.raises(ValueError):
+        AudioCaptcha(sample_format=audio.SampleFormat(8000, 3))
+
+
+def test_audio_layout():
+    captcha = AudioCaptcha(rng=SeededRandomSource(3))
+    captcha.load()
+    layout = captcha.plan_layout('1234')
+    # the last voice ends right before the end of the body
+    offset, voice = layout.voices[-1]
+    assert layout.length == offset + len(voice) + 1
+    assert len(layout.voices) == 4
+
+    data = AudioCaptcha(rng=SeededRandomSource(3)).generate('1234')
+    other = AudioCaptcha(rng=SeededRandomSource(3))
+    other.load()
+    body = other.create_wave_body('1234')
+    assert data == audio.join_wave([body])
+    assert body.startswith(audio.INTRO)
+    assert body.endswith(audio.END_BEEP)
+
+
+def test_lazy_import():
+    script = (
+        'import sys\n'
+        'import captcha\n'
+        'assert not any(name.startswith("captcha.") for name in sys.modules)\n'
+        'from captcha import audio\n'
+        'assert "PIL" not in sys.modules and not audio._assets\n'
+        'assert audio.INTRO.startswith(audio.BEEP)\n'
+        'assert captcha.AudioCaptcha is audio.AudioCaptcha\n'
+        'assert "ImageCaptcha" in dir(captcha)\n'
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+    subprocess.run([sys.executable, '-c', script], env=env, check=True)
+
+    with pytest.raises(AttributeError):
+        audio.VOICES
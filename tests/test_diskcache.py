@@ -0,0 +1,120 @@
+# coding: utf-8
+
+import gc
+import os
+import time
+import pytest
+from captcha.audio import AudioCaptcha
+from captcha.diskcache import DiskCache, main
+from captcha.image import ImageCaptcha
+
+
+def test_disk_cache(tmp_path):
+    path = str(tmp_path / 'cache')
+    with DiskCache(path, shards=4) as cache:
+        with cache.open('1234') as f:
+            ImageCaptcha().write('1234', f)
+        with cache.open('5678') as f:
+            AudioCaptcha().write('5678', f)
+        with pytest.raises(RuntimeError):
+            with cache.open('0000') as f:
+                f.write(b'partial')
+                raise RuntimeError()
+        assert len(cache) == 2
+        assert len(os.listdir(path)) == 4
+
+        key = cache.put('abcd', b'payload')
+        assert cache.put('abcd', b'payload') == key
+        assert bytes(cache.get(key)) == b'payload'
+        assert cache.verify(key, 'abcd')
+        assert not cache.verify(key, 'abce')
+        assert cache.get('00' * 16) is None
+
+        entry = cache.random()
+        assert bytes(entry.payload[:4]) in (b'\x89PNG', b'RIFF', b'payl')
+
+    # read by another process
+    with DiskCache(path) as reader:
+        assert len(reader) == 3
+        assert reader.verify(key, 'abcd')
+
+
+def test_disk_cache_open_without_with(tmp_path):
+    path = str(tmp_path / 'cache')
+    with DiskCache(path, shards=1) as cache:
+        f = cache.open('1234')
+        f.write(b'partial-')
+        del f
+        gc.collect()
+        assert len(cache) == 0
+
+        f = cache.open('5678')
+        f.write(b'complete')
+        f.close()
+        assert len(cache) == 1
+        assert cache.random().key == f.key
+
+
+def test_disk_cache_refresh_compact(tmp_path):
+    path = str(tmp_path / 'cache')
+    writer = DiskCache(path, shards=2)
+    reader = DiskCache(path)
+    old = writer.put('1111', b'old', ttl=0.01)
+    reader.refresh()
+    assert len(reader) == 1
+    payload = reader.get(old)
+    time.sleep(0.02)
+    assert reader.get(old) is None
+    with pytest.raises(KeyError):
+        reader.random()
+
+    new = writer.put('2222', b'new')
+    assert writer.compact() == 1
+    assert len(writer) == 1
+    reader.refresh()
+    assert len(reader) == 1
+    assert bytes(reader.random().payload) == b'new'
+    assert reader.verify(new, '2222')
+    # served payloads stay valid
+    assert bytes(payload) == b'old'
+    payload.release()
+    writer.close()
+    reader.close()
+
+
+def test_disk_cache_compact_by_another_process(tmp_path):
+    path = str(tmp_path / 'cache')
+    with DiskCache(path, shards=1) as writer:
+        writer.put('1111', b'old', ttl=-1)
+        writer.put('2222', b'live')
+        assert main(['compact', path]) == 0
+        key = writer.put('3333', b'new')
+        assert len(writer) == 2
+    with DiskCache(path) as reader:
+        assert len(reader) == 2
+        assert bytes(reader.get(key)) == b'new'
+        assert reader.verify(key, '3333')
+
+
+def test_disk_cache_torn_record(tmp_path):
+    path = str(tmp_path / 'cache')
+    with DiskCache(path, shards=1) as cache:
+        cache.put('1234', b'complete')
+    shard = os.path.join(path, os.listdir(path)[0])
+    with open(shard, 'ab') as f:
+        f.write(b'\x00' * 30)
+    with DiskCache(path) as cache:
+        assert len(cache) == 1
+        key = cache.put('5678', b'appended')
+    with DiskCache(path) as cache:
+        assert len(cache) == 2
+        assert bytes(cache.get(key)) == b'appended'
+
+
+def test_disk_cache_cli(tmp_path, capsys):
+    path = str(tmp_path / 'cache')
+    assert main(['prefill', path, '-n', '4', '-j', '1', '--shards', '2']) == 0
+    assert '4 CAPTCHAs added' in capsys.readouterr().out
+    assert main(['info', path]) == 0
+    assert '2 shards, 4 entries, 4 alive' in capsys.readouterr().out
+    assert main(['compact', path]) == 0
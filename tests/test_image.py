@@ -17,3 +17,133 @@ def test_save_image():
     filepath = os.path.join(ROOT, 'demo.png')
     captcha.write('1234', filepath)
     assert os.path.isfile(filepath)
+
+
+def test_glyph_cache():
+    # a single font size, the second CAPTCHA draws the same glyphs
+    captcha = ImageCaptcha(font_sizes=(42,))
+    captcha.generate('1234')
+    glyphs = captcha.glyphs
+    assert 0 < len(glyphs) <= glyphs.maxsize
+    assert glyphs.misses == len(glyphs)
+
+    captcha.generate('1234')
+    assert glyphs.hits > 0
+
+
+def test_glyph_cache_disabled():
+    captcha = ImageCaptcha()
+    captcha.glyph_cache_size = 0
+    data = captcha.generate('1234')
+    assert hasattr(data, 'read')
+    assert len(captcha.glyphs) == 0
+
+
+def test_image_generate_many():
+    captcha = ImageCaptcha()
+    codes = ['1234', 'ABCD', '5678']
+    rv = list(captcha.generate_many(codes))
+    assert [chars for chars, _ in rv] == codes
+    for _, data in rv:
+        assert data.startswith(b'\x89PNG')
+
+
+def test_fused_warp():
+    from captcha.rng import SeededRandomSource
+    from PIL import ImageChops, ImageStat
+
+    classic = ImageCaptcha(rng=SeededRandomSource(1))
+    fused = ImageCaptcha(rng=SeededRandomSource(1))
+    fused.fused_warp = True
+    options = {'bg_color': (255, 255, 255), 'fg_color': (20, 60, 120)}
+    a = classic.generate_image('1234', **options).convert('L')
+    b = fused.generate_image('1234', **options).convert('L')
+    assert a.size == b.size
+    # the same shapes, only the edges are different
+    diff = ImageStat.Stat(ImageChops.difference(a, b)).mean[0]
+    assert diff < 10
+
+    fused.glyph_cache_size = 0
+    data = fused.generate('1234')
+    assert data.read(4) == b'\x89PNG'
+
+
+def test_batch_composite():
+    from captcha.rng import SeededRandomSource
+    from PIL import ImageChops, ImageStat
+
+    color, background = (20, 60, 120), (255, 255, 255)
+    for fused_warp in (True, False):
+        images = []
+        for batch in (False, True):
+            captcha = ImageCaptcha(rng=SeededRandomSource(1))
+            captcha.fused_warp = fused_warp
+            captcha.batch_composite = batch
+            images.append(captcha.create_captcha_image('1234', color, background))
+        diff = ImageChops.difference(*images).convert('L')
+        if fused_warp:
+            # one screen of the masks is a paste after another, but rounding
+            assert diff.getextrema()[1] <= 2
+        else:
+            assert ImageStat.Stat(diff).mean[0] < 5
+
+
+def test_overflow_text():
+    captcha = ImageCaptcha(width=80, height=40)
+    im = captcha.create_captcha_image('12345678ABCD', (20, 60, 120), (255, 255, 255))
+    assert im.size == (80, 40)
+    # the squeezed text still reaches the right half
+    assert im.crop((40, 0, 80, 40)).convert('L').getextrema()[0] < 255
+
+
+def test_noise_atlas():
+    from captcha.image import NoiseAtlas
+    from PIL.Image import new
+
+    atlas = NoiseAtlas((160, 60), variants=4)
+    assert len(atlas.dots) == 4
+    assert len(atlas.curves) == 4
+    assert atlas.dots[0].size == (320, 120)
+
+    im = new('RGB', (160, 60), (255, 255, 255))
+    atlas.draw_dots(im, (0, 0, 0))
+    atlas.draw_curve(im, (0, 0, 0, 200))
+    assert im.getextrema()[0][0] == 0
+
+    captcha = ImageCaptcha()
+    captcha.noise_variants = 2
+    data = captcha.generate('1234')
+    assert data.read(4) == b'\x89PNG'
+    assert len(captcha.noise_atlas.dots) == 2
+
+
+def test_output_profiles():
+    from io import BytesIO
+    from captcha.image import OutputProfile, PROFILES
+
+    captcha = ImageCaptcha()
+    for name, profile in PROFILES.items():
+        data = captcha.generate('1234', profile=name).getvalue()
+        assert data
+        if profile.format == 'png':
+            assert data.startswith(b'\x89PNG')
+
+    out = BytesIO(b'head')
+    out.seek(4)
+    rv = captcha.generate('1234', profile=OutputProfile('jpeg', options={'quality': 50}), out=out)
+    assert rv is out
+    assert out.getvalue()[:6] == b'head\xff\xd8'
+
+    codes = ['1234', 'ABCD']
+    for _, data in captcha.generate_many(codes, profile='png-palette'):
+        assert data.startswith(b'\x89PNG')
+
+
+def test_image_warmup():
+    captcha = ImageCaptcha()
+    elapsed = captcha.warmup('0123')
+    assert elapsed > 0
+    assert len(captcha.glyphs) >= 4 * len(captcha.truefonts)
+    # the fonts are shared by other instances
+    other = ImageCaptcha()
+    assert other.truefonts[0] is captcha.truefonts[0]
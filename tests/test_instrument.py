@@ -0,0 +1,47 @@
+# coding: utf-8
+
+import pytest
+from captcha.audio import AudioCaptcha
+from captcha.image import ImageCaptcha
+from captcha.instrument import StageStats, PrometheusObserver, stage
+
+
+def test_stage_disabled():
+    with stage(None, 'noop'):
+        pass
+
+
+def test_image_stages():
+    stats = StageStats()
+    captcha = ImageCaptcha(observer=stats)
+    captcha.generate('1234')
+    summary = stats.summary()
+    for name in ('image.composite', 'image.noise', 'image.smooth', 'image.encode'):
+        assert summary[name]['count'] == 1
+    assert summary['image.glyph']['count'] >= 4
+    assert summary['image.warp']['count'] == summary['image.glyph']['count']
+    assert sum(stats.histograms['image.encode']) == 1
+
+    captcha.fused_warp = True
+    captcha.generate('1234')
+    assert stats.counts['image.encode'] == 2
+
+    stats.clear()
+    assert stats.summary() == {}
+
+
+def test_audio_stages():
+    calls = []
+    captcha = AudioCaptcha(observer=lambda name, seconds: calls.append(name))
+    captcha.generate('1234')
+    assert calls == ['audio.twist', 'audio.noise', 'audio.mix', 'audio.header']
+
+
+def test_prometheus_observer():
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    captcha = ImageCaptcha(observer=PrometheusObserver(registry=registry))
+    captcha.generate('1234')
+    count = registry.get_sample_value(
+        'captcha_stage_seconds_count', {'stage': 'image.encode'})
+    assert count == 1
@@ -0,0 +1,24 @@
+# coding: utf-8
+
+from functools import partial
+from captcha.image import ImageCaptcha
+from captcha.audio import AudioCaptcha
+from captcha.parallel import ParallelCaptcha
+
+
+def test_parallel_image():
+    with ParallelCaptcha(partial(ImageCaptcha, width=120), max_workers=2) as pool:
+        data = pool.generate('1234')
+        assert data.startswith(b'\x89PNG')
+
+        future = pool.submit('5678', format='jpeg')
+        assert future.result().startswith(b'\xff\xd8')
+
+
+def test_parallel_generate_many():
+    codes = [str(i) for i in range(1000, 1010)]
+    with ParallelCaptcha(AudioCaptcha, max_workers=2) as pool:
+        rv = list(pool.generate_many(codes, chunksize=3))
+    assert [chars for chars, _ in rv] == codes
+    for _, data in rv:
+        assert data.startswith(b'RIFF')
@@ -0,0 +1,76 @@
+# coding: utf-8
+
+import time
+from captcha.image import ImageCaptcha
+from captcha.audio import AudioCaptcha
+from captcha.pool import CaptchaPool
+from captcha.rng import SeededRandomSource
+
+
+def _wait_for(pool, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while len(pool) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_pool_refill():
+    with CaptchaPool(ImageCaptcha(), size=5, low_water=3, workers=2) as pool:
+        _wait_for(pool, 5)
+        assert len(pool) == 5
+        assert pool.nbytes > 0
+
+        answer, data = pool.pop()
+        assert len(answer) == 4
+        assert data.startswith(b'\x89PNG')
+        assert pool.hits == 1
+
+        for _ in range(3):
+            pool.pop()
+        _wait_for(pool, 5)
+        assert len(pool) == 5
+        assert pool.refill_lag > 0
+    assert len(pool) == 0
+
+
+def test_pool_miss_and_ttl():
+    pool = CaptchaPool(AudioCaptcha(), size=2, ttl=0.05)
+    answer, data = pool.pop()
+    assert pool.misses == 1
+    assert pool.hit_rate == 0
+    assert data.startswith(b'RIFF')
+
+    pool.start()
+    _wait_for(pool, 2)
+    time.sleep(0.1)
+    pool.pop()
+    assert pool.expired >= 2
+    pool.close()
+
+
+def test_pool_seeded_answers():
+    pools = [CaptchaPool(ImageCaptcha(rng=SeededRandomSource(7))) for _ in range(2)]
+    answers = [[pool.random() for _ in range(3)] for pool in pools]
+    assert answers[0] == answers[1]
+    assert len(answers[0][0]) == 4
+
+
+class _FlakyCaptcha:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, chars):
+        self.calls += 1
+        if self.calls == 1:
+            raise OSError('transient')
+        return b'payload'
+
+
+def test_pool_refill_error():
+    pool = CaptchaPool(_FlakyCaptcha(), size=3)
+    pool.retry_delay = 0.01
+    with pool:
+        _wait_for(pool, 3)
+        assert len(pool) == 3
+        assert pool.errors == 1
+        assert pool.pop()[1] == b'payload'
+        assert pool.misses == 0
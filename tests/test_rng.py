@@ -0,0 +1,42 @@
+# coding: utf-8
+
+import pytest
+from captcha.rng import BufferedRandomSource, SeededRandomSource, SystemRandomSource
+from captcha.image import ImageCaptcha
+from captcha.audio import AudioCaptcha
+
+
+@pytest.mark.parametrize('source', [
+    SystemRandomSource(),
+    BufferedRandomSource(block_size=64),
+    SeededRandomSource(1),
+])
+def test_random_source(source):
+    values = [source.randbelow(10) for _ in range(500)]
+    assert set(values) == set(range(10))
+    assert all(0 <= source.random() < 1 for _ in range(100))
+    assert 0 <= source.randbits(12) < 4096
+    assert source.choice('abc') in 'abc'
+    assert len(source.randbytes(100)) == 100
+    with pytest.raises(ValueError):
+        source.randbelow(0)
+
+
+def test_seeded_source():
+    a = SeededRandomSource(42)
+    b = SeededRandomSource(42)
+    assert a.randbytes(32) == b.randbytes(32)
+    assert [a.randbelow(100) for _ in range(10)] == [b.randbelow(100) for _ in range(10)]
+
+
+def test_seeded_image():
+    data = [
+        ImageCaptcha(rng=SeededRandomSource(7)).generate('1234').getvalue()
+        for _ in range(2)
+    ]
+    assert data[0] == data[1]
+
+
+def test_seeded_audio():
+    data = [AudioCaptcha(rng=SeededRandomSource(7)).generate('1234') for _ in range(2)]
+    assert data[0] == data[1]
@@ -0,0 +1,74 @@
+# coding: utf-8
+
+import os
+import pytest
+from captcha.audio import AudioCaptcha, DATA_DIR, _read_wave_file
+from captcha.rng import SeededRandomSource
+from captcha.voicepack import VoicePack, build, main
+
+
+def test_build_voicepack(tmp_path):
+    output = str(tmp_path / 'voices.pack')
+    count = build(DATA_DIR, output)
+    assert count > 0
+
+    with VoicePack(output) as pack:
+        assert len(pack) == count
+        assert pack.sampwidth == 1
+        assert pack.framerate == 8000
+        assert sorted(pack.choices) == sorted(AudioCaptcha().choices)
+        voices = pack.voices('5')
+        filepath = os.path.join(DATA_DIR, '5', 'default.wav')
+        assert bytes(voices[0]) == bytes(_read_wave_file(filepath))
+        del voices
+
+
+def test_audio_captcha_voicepack(tmp_path):
+    output = str(tmp_path / 'voices.pack')
+    build(DATA_DIR, output)
+
+    captcha = AudioCaptcha(voicedir=output, rng=SeededRandomSource(1))
+    assert captcha.voicepack is not None
+    data = captcha.generate('1234')
+    # the same audio as the voice directory
+    expected = AudioCaptcha(rng=SeededRandomSource(1)).generate('1234')
+    assert data == expected
+
+
+def test_close_loaded_voicepack(tmp_path):
+    output = str(tmp_path / 'voices.pack')
+    build(DATA_DIR, output)
+
+    captcha = AudioCaptcha(voicedir=output, rng=SeededRandomSource(1))
+    data = captcha.generate('1234')
+    pack = captcha.voicepack
+    assert pack is not None
+    # the loaded voices are still views of the pack
+    pack.close()
+    assert captcha.generate('1234').startswith(b'RIFF')
+    other = AudioCaptcha(voicedir=output, rng=SeededRandomSource(1))
+    assert other.generate('1234') == data
+
+
+def test_build_voicepack_error(tmp_path):
+    output = str(tmp_path / 'missing' / 'voices.pack')
+    with pytest.raises(FileNotFoundError) as excinfo:
+        build(DATA_DIR, output)
+    # the error of open(), not of removing the temporary file
+    assert excinfo.value.__context__ is None
+    assert not os.path.exists(output + '.tmp')
+
+
+def test_invalid_voicepack(tmp_path):
+    filepath = tmp_path / 'invalid.pack'
+    filepath.write_bytes(b'0' * 64)
+    with pytest.raises(ValueError):
+        VoicePack(str(filepath))
+
+
+def test_voicepack_cli(tmp_path, capsys):
+    output = str(tmp_path / 'voices.pack')
+    assert main(['build', DATA_DIR, output]) == 0
+    assert main(['info', output]) == 0
+    captured = capsys.readouterr()
+    assert '8-bit 8000Hz' in captured.out